@@ -1,13 +1,15 @@
 # Import the required libraries and modules
 import numpy as np
-import scipy.stats as st
-import torch as th
-import huggingface as hf
 
 # Import the brain_lib and brain_ml modules
 import brain_lib as bl
 import brain_ml as bm
 
+# Import the heavy libraries and modules lazily, on first use
+st = bl.lazy_import('scipy.stats')
+th = bl.lazy_import('torch')
+hf = bl.lazy_import('huggingface')
+
 # Define the global variables and constants
 EEG_AUGMENTATION = 0.1 # The amount of augmentation for EEG
 FMRI_STIMULATION = 0.2 # The amount of stimulation for fMRI
@@ -15,8 +17,9 @@ OPTO_EMULATION = 0.3 # The amount of emulation for optogenetics
 
 # Define the class for providing feedback and guidance to the brain using EEG
 class EEGAugmentor:
-    def __init__(self):
+    def __init__(self, device=None):
         # Initialize the EEG augmentor
+        device = device or bl.open_device(bl.EEG_DEVICE) # Open the EEG device unless one is given (e.g. a replay device)
         self.reader = bl.EEGReader(device) # Create an EEG reader object
         self.classifier = bm.EEGClassifier() # Create an EEG classifier object
 
@@ -40,14 +43,23 @@ class EEGAugmentor:
 
 # Define the class for providing feedback and guidance to the brain using fMRI
 class FMRIStimulator:
-    def __init__(self):
+    def __init__(self, device=None):
         # Initialize the fMRI stimulator
+        device = device or bl.open_device(bl.FMRI_DEVICE) # Open the fMRI device unless one is given (e.g. a replay device)
         self.writer = bl.FMRIWriter(device) # Create an fMRI writer object
         self.analyzer = bm.FMRIAnalyzer() # Create an fMRI analyzer object
 
-    def stimulate(self, data):
+    def load(self, data=None):
+        # Load the fMRI data from a file, from the device (if none is given) or as is
+        if data is None: # If no data is given, read a volume from the device
+            return self.writer.read()
+        if isinstance(data, str): # If a filename is given, load the volume from the file
+            return self.writer.load(data)
+        return np.asarray(data).flatten() # Otherwise use the given data
+
+    def stimulate(self, data=None):
         # Stimulate the fMRI data
-        data = self.writer.load(filename) # Load the fMRI data from a file
+        data = self.load(data) # Load the fMRI data
         output = self.analyzer.analyze(data) # Analyze the fMRI data
         data = data + FMRI_STIMULATION * output # Add the output to the data
         data = np.clip(data, 0, 1) # Clip the data to the range [0, 1]
@@ -60,8 +72,9 @@ class FMRIStimulator:
 
 # Define the class for providing feedback and guidance to the brain using optogenetics
 class OptoEmulator:
-    def __init__(self):
+    def __init__(self, device=None):
         # Initialize the optogenetics emulator
+        device = device or bl.open_device(bl.OPTO_DEVICE) # Open the optogenetics device unless one is given (e.g. a replay device)
         self.stimulator = bl.OptoStimulator(device) # Create an optogenetics stimulator object
         self.decoder = bm.OptoDecoder() # Create an optogenetics decoder object
 
@@ -0,0 +1,335 @@
+# Import the required libraries and modules
+import os
+import sys
+import time
+import tempfile
+import itertools
+import subprocess
+import tracemalloc
+import numpy as np
+
+# Import the brain_lib, brain_norm, brain_replay, brain_codec, brain_enh, brain_aug, and brain_session modules (brain_gui is imported by bench_gui)
+import brain_lib as bl
+import brain_norm as bn
+import brain_replay as br
+import brain_codec as bz
+import brain_enh as be
+import brain_aug as ba
+import brain_session as bs
+
+# Define the global variables and constants
+BENCH_CHUNKS = 100 # The number of chunks per benchmark
+BENCH_EEG_SAMPLES = br.EEG_FRAME # The number of samples per EEG chunk (one frame, as read by EEGReader)
+BENCH_NORMALIZATION_FACTOR = 0.1 # The factor of the normalization score of the old BrainNormalizer
+BENCH_VALIDATION_THRESHOLD = 0.9 # The threshold of the validation score of the old BrainValidator
+BENCH_FMRI_VOLUMES = 1 # The number of volumes per fMRI chunk
+BENCH_OPTO_SAMPLES = 256 # The number of optogenetics samples scored per benchmark
+BENCH_GUI_SECONDS = 10 # The number of seconds the GUI is probed while the pipeline streams
+BENCH_GUI_INTERVAL = 10 # Milliseconds between two probes of the GUI event loop
+BENCH_REPLAY_FRAMES = 60 # The number of EEG frames in the replayed session (ten minutes)
+BENCH_REPLAY_VOLUMES = 10 # The number of fMRI volumes replayed through the attention enhancer
+BENCH_CODEC_REPEATS = 5 # The number of encodings and decodings timed per codec
+BENCH_SESSION_SUBJECTS = (1, 10, 100) # The numbers of subjects served by one session manager
+BENCH_SESSION_FRAMES = 2 # The number of EEG frames remembered per subject
+BENCH_SESSION_SWITCHES = 200 # The number of random subject switches timed
+BENCH_SESSION_POOL_BYTES = 64 * 1024 ** 2 # The bytes of inactive states kept in memory, small enough that the states spill
+BENCH_SESSION_FILLED = (3, 128, 10) # The subjects, EEG frames remembered per subject and switches of the case with filled memory buffers
+BENCH_IMPORTS = {'main': 'brain_main', 'record': 'brain_lib, brain_db', 'replay': 'brain_com, brain_replay', 'serve': 'brain_com, brain_db', 'gui': 'brain_gui', 'bench': 'brain_bench'} # The modules imported by each subcommand
+BENCH_IMPORTS_TOP = 5 # The number of slowest imports reported per subcommand
+
+# Define the function for measuring the time and allocations of a function over a stream of chunks
+def measure(function, chunks):
+    # Run the function once per chunk, returning the mean time and peak allocation per chunk
+    function(chunks[0].copy()) # Warm up the function
+    times = [] # Initialize the list of times
+    peak = 0 # Initialize the peak allocation
+    for chunk in chunks:
+        tracemalloc.start() # Start tracing the allocations
+        start = time.perf_counter() # Start the timer
+        function(chunk)
+        times.append(time.perf_counter() - start) # Stop the timer
+        peak = max(peak, tracemalloc.get_traced_memory()[1]) # Get the peak allocation of the call
+        tracemalloc.stop() # Stop tracing the allocations
+    return {'ms_per_chunk': 1000 * np.mean(times), 'peak_bytes_per_chunk': peak, 'chunk_bytes': chunks[0].nbytes}
+
+# Define the function for benchmarking the online normalization of the EEG and fMRI data
+def bench_norm():
+    # Benchmark the per-channel EEG and per-voxel fMRI running statistics against the full-array baseline
+    voxels = bl.FMRI_SHAPE[0] * bl.FMRI_SHAPE[1] * bl.FMRI_SHAPE[2] # The number of voxels in a volume
+    eeg = [np.random.randn(bl.EEG_CHANNELS, BENCH_EEG_SAMPLES) for _ in range(BENCH_CHUNKS)] # Create the EEG chunks
+    fmri = [np.random.rand(BENCH_FMRI_VOLUMES, voxels) for _ in range(BENCH_CHUNKS // 10)] # Create the fMRI chunks
+    normalizer = bn.BrainNormalizer.__new__(bn.BrainNormalizer) # Skip loading the enhancer (only the normalization is measured)
+    normalizer.stats = bn.RunningStats(bl.EEG_CHANNELS, axis=1) # Create the per-channel running statistics
+    normalizer.clip = bn.NORMALIZATION_CLIP # The clip of the standardized data
+    validator = bn.BrainValidator.__new__(bn.BrainValidator) # Skip loading the enhancer (only the validation is measured)
+    validator.voxels = voxels # The number of voxels in a volume
+    validator.stats = bn.RunningStats(voxels, axis=0) # Create the per-voxel running statistics
+    validator.clip = bn.VALIDATION_CLIP # The clip of the standardized data
+    baseline = {'normalization': 0, 'validation': 0} # The scalar scores of the baseline
+
+    def eeg_baseline(data):
+        # Normalize an EEG chunk exactly like the full-array BrainNormalizer.normalize did
+        baseline['normalization'] = baseline['normalization'] + BENCH_NORMALIZATION_FACTOR * np.mean(data) # Update the normalization score
+        baseline['normalization'] = np.clip(baseline['normalization'], -1, 1) # Clip the normalization score to the range [-1, 1]
+        data = data - baseline['normalization'] # Subtract the normalization score from the data
+        data = np.clip(data, -1, 1) # Clip the data to the range [-1, 1]
+        return data
+
+    def fmri_baseline(data):
+        # Validate an fMRI chunk exactly like the full-array BrainValidator.validate did
+        baseline['validation'] = baseline['validation'] + BENCH_VALIDATION_THRESHOLD * np.std(data) # Update the validation score
+        baseline['validation'] = np.clip(baseline['validation'], 0, 1) # Clip the validation score to the range [0, 1]
+        data = data * baseline['validation'] # Multiply the data by the validation score
+        data = np.clip(data, 0, 1) # Clip the data to the range [0, 1]
+        return data
+
+    return {
+        'eeg_online': measure(normalizer.normalize_chunk, eeg),
+        'eeg_baseline': measure(eeg_baseline, eeg),
+        'fmri_online': measure(validator.validate_chunk, fmri),
+        'fmri_baseline': measure(fmri_baseline, fmri),
+    }
+
+# Define the function for benchmarking the ethics scoring with and without batching
+def bench_ethics():
+    # Benchmark the scores per second and the latency added to the optogenetics path
+    scorer = bn.EthicsScorer() # Load the ethics model once for all cases
+    samples = [np.random.rand(bl.OPTO_REGIONS) for _ in range(BENCH_OPTO_SAMPLES)] # Create the optogenetics samples
+    results = {}
+    for case, batch_size in (('batched', bn.ETHICS_BATCH_SIZE), ('unbatched', 1)):
+        worker = bn.ScoreWorker(scorer, batch_size=batch_size) # Create a fresh worker with an empty cache
+        start = time.perf_counter() # Start the timer
+        futures = [worker.submit(sample) for sample in samples] # Queue all the samples at once
+        for future in futures:
+            future.result() # Wait for all the scores
+        elapsed = time.perf_counter() - start # Stop the timer
+        latencies = [] # Initialize the latencies of the optogenetics path
+        for sample in samples:
+            start = time.perf_counter() # Start the timer
+            try:
+                worker.submit(sample + 1).result(timeout=bn.ETHICS_TIMEOUT) # Wait for a new score like ethicize does
+            except bn.cf.TimeoutError: # If the score is late, the path moves on with the last score
+                pass
+            latencies.append(time.perf_counter() - start) # Stop the timer
+        results[case] = {'scores_per_s': len(samples) / elapsed, 'batches': float(worker.batches), 'opto_ms_p50': 1000 * np.median(latencies), 'opto_ms_p99': 1000 * np.percentile(latencies, 99)}
+        worker.close()
+    scorer.close()
+    return results
+
+# Define the class for controlling the GUI with replayed data, without the devices and the models
+class ReplayController:
+    def __init__(self):
+        # Initialize the controller with looping replayed sessions and the online normalization
+        voxels = bl.FMRI_SHAPE[0] * bl.FMRI_SHAPE[1] * bl.FMRI_SHAPE[2] # The number of voxels in a volume
+        self.eeg_device = br.ReplayDevice(itertools.cycle([synthetic_eeg()]), bl.EEG_DURATION, speed=0) # Replay EEG as fast as possible
+        self.fmri_device = br.ReplayDevice(itertools.cycle([synthetic_fmri()]), br.REPLAY_FMRI_TR, speed=0) # Replay fMRI as fast as possible
+        for device in (self.eeg_device, self.fmri_device):
+            device.connect()
+            device.start()
+        self.normalizer = bn.BrainNormalizer.__new__(bn.BrainNormalizer) # Skip loading the enhancer
+        self.normalizer.stats = bn.RunningStats(bl.EEG_CHANNELS, axis=1) # Create the per-channel running statistics
+        self.normalizer.clip = bn.NORMALIZATION_CLIP # The clip of the standardized data
+        self.validator = bn.BrainValidator.__new__(bn.BrainValidator) # Skip loading the enhancer
+        self.validator.voxels = voxels # The number of voxels in a volume
+        self.validator.stats = bn.RunningStats(voxels, axis=0) # Create the per-voxel running statistics
+        self.validator.clip = bn.VALIDATION_CLIP # The clip of the standardized data
+
+    def eeg(self, data=None):
+        # Read and normalize the next replayed EEG frame
+        return self.normalizer.normalize_chunk(self.eeg_device.read().copy())
+
+    def fmri(self, data=None):
+        # Read and validate the next replayed fMRI volume
+        return self.validator.validate_chunk(self.fmri_device.read().copy())
+
+    def send(self, data):
+        # Send nothing, the replay has no host
+        return data
+
+    def receive(self):
+        # Receive the next replayed fMRI volume
+        return self.fmri_device.read()
+
+    def solve(self, query):
+        # Echo the query, the replay has no models
+        return query
+
+    def close(self):
+        # Close the replayed sessions
+        for device in (self.eeg_device, self.fmri_device):
+            device.stop()
+            device.disconnect()
+
+# Define the function for benchmarking the latency of the GUI event loop while the pipeline streams
+def bench_gui():
+    # Probe the Tk event loop with after() while replayed data streams through the pipeline (run headless with xvfb-run)
+    import brain_gui as bg
+    gui = bg.BrainGUI(loader=ReplayController) # Create the GUI, which loads the controller in the background
+    gui.window.withdraw() # Hide the window
+    start = time.perf_counter() # Start the timer
+    while gui.controller is None and gui.error is None: # Keep the event loop running until the controller is loaded or failed
+        gui.window.update()
+        time.sleep(bg.POLL_INTERVAL / 1000)
+    startup = time.perf_counter() - start # Stop the timer
+    if gui.error is not None: # If the loading failed, stop and report it
+        gui.close()
+        return {'event_loop': {'error': repr(gui.error)}}
+    gui.start() # Start streaming the data through the pipeline
+    lateness = [] # Initialize the lateness of the probes
+
+    def probe(expected):
+        # Record how late the probe ran and schedule the next one
+        now = time.perf_counter()
+        lateness.append(now - expected)
+        gui.window.after(BENCH_GUI_INTERVAL, probe, now + BENCH_GUI_INTERVAL / 1000)
+
+    gui.window.after(BENCH_GUI_INTERVAL, probe, time.perf_counter() + BENCH_GUI_INTERVAL / 1000) # Schedule the first probe
+    gui.window.after(1000 * BENCH_GUI_SECONDS, gui.window.quit) # Stop the event loop after the probing time
+    gui.window.mainloop()
+    gui.close()
+    return {'event_loop': {'startup_s': startup, 'probes': len(lateness), 'late_ms_p50': 1000 * np.median(lateness), 'late_ms_p99': 1000 * np.percentile(lateness, 99), 'late_ms_max': 1000 * np.max(lateness)}}
+
+# Define the function for benchmarking the replay of a session at maximum speed
+def bench_replay():
+    # Replay synthetic sessions as fast as possible through the reader, the online normalization, the EEG augmentor and the attention enhancer
+    frames = [np.random.randn(bl.EEG_CHANNELS, br.EEG_FRAME) for _ in range(BENCH_REPLAY_FRAMES)] # Create the recorded session
+    results = {}
+    for case, normalize in (('reader', False), ('reader+norm', True)):
+        device = br.ReplayDevice(iter(frames), bl.EEG_DURATION, speed=0) # Open the session at maximum speed
+        reader = bl.EEGReader(device) # Read the session through the device interface
+        stats = bn.RunningStats(bl.EEG_CHANNELS, axis=1) # Create the per-channel running statistics
+        try:
+            while True:
+                data = reader.read() # Read the next frame
+                if normalize: # If the stage is enabled, normalize the frame in place
+                    stats.standardize(data)
+        except EOFError: # If the session is over, stop
+            pass
+        results[case] = device.throughput() # Get the throughput of the replay
+        reader.close()
+    eeg = br.ReplayDevice(iter(frames), bl.EEG_DURATION, speed=0) # Open the EEG session at maximum speed
+    fmri = br.ReplayDevice(iter([synthetic_fmri() for _ in range(BENCH_REPLAY_VOLUMES)]), br.REPLAY_FMRI_TR, speed=0) # Open the fMRI session at maximum speed
+    for case, device, stage, step in (('augmentor', eeg, ba.EEGAugmentor, lambda augmentor: augmentor.augment(None)), ('attention', fmri, be.AttentionEnhancer, lambda enhancer: enhancer.enhance(None))):
+        try:
+            stage = stage(device) # Load the pipeline stage with its models, reading from the replayed session
+        except Exception as error: # If the models cannot be loaded, report it and go on with the other cases
+            results[case] = {'error': repr(error)}
+            device.disconnect() # Stop the reader thread the stage may have started
+            continue
+        try:
+            while True:
+                step(stage) # Run the next frame through the pipeline stage
+        except EOFError: # If the session is over, stop
+            pass
+        results[case] = device.throughput() # Get the throughput of the replay
+        stage.close()
+    return results
+
+# Define the function for creating a synthetic EEG recording
+def synthetic_eeg():
+    # Create a (channels x samples) float64 recording of drifting noise and an alpha rhythm, in microvolts
+    t = np.arange(br.EEG_FRAME) / bl.EEG_SAMPLING_RATE # The time of the samples
+    drift = np.cumsum(np.random.randn(bl.EEG_CHANNELS, br.EEG_FRAME), axis=1) # The low-frequency drift
+    alpha = 20 * np.sin(2 * np.pi * 10 * t + np.random.rand(bl.EEG_CHANNELS, 1) * 2 * np.pi) # The 10 Hz alpha rhythm
+    return np.round(drift + alpha + 5 * np.random.randn(bl.EEG_CHANNELS, br.EEG_FRAME), 2) # Keep the resolution of a 0.01 uV amplifier
+
+# Define the function for creating a synthetic fMRI volume
+def synthetic_fmri():
+    # Create a flattened float64 volume of a head-shaped ellipsoid with noisy intensities
+    grid = np.indices(bl.FMRI_SHAPE) - np.array(bl.FMRI_SHAPE)[:, None, None, None] / 2 # The coordinates of the voxels around the center
+    mask = np.sum((grid / (np.array(bl.FMRI_SHAPE)[:, None, None, None] / 2.5)) ** 2, axis=0) < 1 # The voxels inside the head
+    return np.round(mask * (800 + 20 * np.random.randn(*bl.FMRI_SHAPE)), 1).flatten() # Keep the resolution of the scanner
+
+# Define the function for benchmarking the codecs
+def bench_codec():
+    # Measure the compression ratio, the encode and decode speeds, and the bytes saved per recorded hour
+    results = {}
+    for kind, data, per_hour in (('eeg', synthetic_eeg(), 3600 / bl.EEG_DURATION), ('fmri', synthetic_fmri(), 3600 / br.REPLAY_FMRI_TR)):
+        raw = data.nbytes # The size of the float64 bytes written before the codecs
+        for name in bz.CODECS:
+            start = time.perf_counter() # Start the timer
+            for _ in range(BENCH_CODEC_REPEATS):
+                blob = bz.encode(data, name) # Encode the data
+            encode = (time.perf_counter() - start) / BENCH_CODEC_REPEATS # Stop the timer
+            start = time.perf_counter() # Start the timer
+            for _ in range(BENCH_CODEC_REPEATS):
+                decoded = bz.decode(blob) # Decode the data
+            decode = (time.perf_counter() - start) / BENCH_CODEC_REPEATS # Stop the timer
+            results[f'{kind}-{name}'] = {'ratio': raw / len(blob), 'encode_mb_s': raw / encode / 1e6, 'decode_mb_s': raw / decode / 1e6, 'mb_saved_per_hour': (raw - len(blob)) * per_hour / 1e6, 'max_error': float(np.max(np.abs(decoded - data)))}
+    return results
+
+# Define the function for benchmarking the memory and the switch latency of the session manager
+def bench_sessions():
+    # Serve 1 to 100 subjects with one pipeline, and a few subjects with filled memory buffers (a full buffer of MEMORY_SIZE frames is 1.34 GB)
+    results = {}
+    for subjects in BENCH_SESSION_SUBJECTS:
+        results[f'{subjects}_subjects'] = session_case(subjects, BENCH_SESSION_FRAMES, BENCH_SESSION_SWITCHES)
+    subjects, frames, switches = BENCH_SESSION_FILLED
+    results[f'{subjects}_subjects_{frames}_frames'] = session_case(subjects, frames, switches)
+    return results
+
+# Define the function for benchmarking the session manager with a number of subjects and remembered frames
+def session_case(subjects, frames, switches):
+    # Fill the state of each subject, then time random switches between the subjects
+    pipeline = {} # The pipeline objects, without their models and devices (only the subject state is measured)
+    for name, cls in (('memory', be.MemoryEnhancer), ('attention', be.AttentionEnhancer), ('creativity', be.CreativityEnhancer)):
+        pipeline[name] = cls.__new__(cls) # Skip loading the models
+        pipeline[name].reset_state() # Create the empty subject state
+    eeg = synthetic_eeg() # The recorded EEG frame remembered by the subjects
+    with tempfile.TemporaryDirectory() as directory:
+        tracemalloc.start() # Start tracing the allocations
+        manager = bs.SessionManager(pipeline, pool_bytes=BENCH_SESSION_POOL_BYTES, directory=directory) # Create the session manager
+        for subject in range(subjects): # Fill the state of each subject
+            manager.activate(subject)
+            for _ in range(frames):
+                pipeline['memory'].remember(eeg)
+            pipeline['attention'].attend(np.random.rand(bl.FMRI_SHAPE[0] * bl.FMRI_SHAPE[1] * bl.FMRI_SHAPE[2]))
+        latencies = [] # Initialize the switch latencies
+        for subject in np.random.randint(subjects, size=switches):
+            start = time.perf_counter() # Start the timer
+            manager.activate(int(subject)) # Switch to the subject
+            latencies.append(time.perf_counter() - start) # Stop the timer
+        held, peak = tracemalloc.get_traced_memory() # Get the memory held by the states
+        tracemalloc.stop() # Stop tracing the allocations
+        state = bs.state_bytes(manager.capture()) / 1e6 # Get the size of the active state
+        disk = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 1e6 # Get the size of the spilled states
+        spilled = len(os.listdir(directory)) # Get the number of spilled states
+    return {'state_mb': state, 'held_mb': held / 1e6, 'peak_mb': peak / 1e6, 'disk_mb_per_state': disk / max(spilled, 1), 'switch_ms_p50': 1000 * np.median(latencies), 'switch_ms_p99': 1000 * np.percentile(latencies, 99), 'loads': manager.loads, 'spills': manager.spills}
+
+# Define the function for benchmarking the import time of each subcommand
+def bench_imports():
+    # Import the modules of each subcommand in a fresh interpreter with -X importtime
+    results = {}
+    for command, modules in BENCH_IMPORTS.items():
+        start = time.perf_counter() # Start the timer
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modules}'], capture_output=True, text=True) # Run a fresh interpreter
+        elapsed = time.perf_counter() - start # Stop the timer
+        imports = [] # Initialize the list of (cumulative time, module) pairs
+        for line in process.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line: # Skip the header and the other output
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|') # Split the self time, the cumulative time and the module
+            if not name.startswith('  '): # Keep only the top-level imports, whose times are not nested in another
+                imports.append((int(cumulative), name.strip()))
+        imports.sort(reverse=True) # Sort the imports from the slowest
+        results[command] = {'startup_s': elapsed, 'import_ms': sum(time for time, _ in imports) / 1000, 'slowest': ', '.join(f'{name}={time / 1000:.1f}ms' for time, name in imports[:BENCH_IMPORTS_TOP])}
+    return results
+
+# Define the function for printing the results of a benchmark
+def report(name, results):
+    # Print one line per measured case
+    for case, result in results.items():
+        print(f'{name:>8} {case:<24} ' + ' '.join(f'{key}={value:.3f}' if isinstance(value, float) else f'{key}={value}' for key, value in result.items()))
+
+# Define the benchmarks by name
+BENCHMARKS = {'imports': bench_imports, 'norm': bench_norm, 'replay': bench_replay, 'codec': bench_codec, 'sessions': bench_sessions, 'ethics': bench_ethics, 'gui': bench_gui}
+
+# Define the main function to run the benchmarks
+def main(names=None):
+    # Run the selected benchmarks, or all of them
+    for name in names or BENCHMARKS:
+        report(name, BENCHMARKS[name]())
+
+# Run the main function if the script is executed
+if __name__ == '__main__':
+    main()
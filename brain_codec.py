@@ -0,0 +1,133 @@
+# Import the required libraries and modules
+import bz2
+import lzma
+import zlib
+import struct
+import numpy as np
+
+# Define the global variables and constants
+CODEC_MAGIC = b'BCZ1' # The magic bytes at the start of an encoded array
+CODEC_HEADER = struct.Struct('<4sBBBb4sBddQ') # Magic, compressor, flags, level, axis, dtype, ndim, scale, offset, payload length
+CODEC_DIM = struct.Struct('<I') # One dimension of the shape, following the header
+FLAG_SHUFFLE = 1 # Shuffle the bytes of the elements before compressing
+FLAG_DELTA = 2 # Encode the differences of the quantized values along the time axis
+FLAG_QUANTIZE = 4 # Quantize the data to int16 with a scale and an offset
+QUANTIZE_LEVELS = 65534 # The number of int16 steps used by the quantization
+DEFAULT_CODEC = 'zlib' # The codec used when none is given
+LEGACY_DTYPE = np.float64 # The dtype of the raw bytes written before the codecs existed
+
+# Define the compressors by id, as stored in the header
+COMPRESSORS = {
+    0: (lambda data, level: data, lambda data: data), # No compression
+    1: (zlib.compress, zlib.decompress), # zlib (deflate)
+    2: (lambda data, level: lzma.compress(data, preset=level), lzma.decompress), # lzma (xz)
+    3: (bz2.compress, bz2.decompress), # bzip2
+}
+
+# Define the class for describing how an array is encoded
+class Codec:
+    def __init__(self, compressor=1, level=6, dtype=np.float32, shuffle=True, delta=False, quantize=False, axis=-1):
+        # Initialize the codec
+        if delta and not quantize: # If the deltas would be taken on float bit patterns, refuse them, as they compress worse than the values
+            raise ValueError('Deltas need quantized data (quantize=True)')
+        self.compressor = compressor # The id of the compressor
+        self.level = level # The compression level
+        self.dtype = np.dtype(dtype) # The dtype stored for float data (ignored when quantizing)
+        self.shuffle = shuffle # Whether to shuffle the bytes of the elements
+        self.delta = delta # Whether to encode the differences of the quantized values along the time axis
+        self.quantize = quantize # Whether to quantize the data to int16
+        self.axis = axis # The time axis of the data
+
+    def encode(self, data):
+        # Encode the array into self-describing bytes
+        data = np.asarray(data) # Convert the data to a numpy array
+        shape = data.shape # Remember the shape of the data
+        axis = self.axis if data.ndim == 0 else self.axis % data.ndim # Get the time axis of the data
+        scale, offset = 1.0, 0.0 # Initialize the quantization parameters
+        if self.quantize: # If the codec is lossy, map the range of the data onto int16
+            low, high = (float(np.min(data)), float(np.max(data))) if data.size else (0.0, 0.0) # Get the range of the data
+            offset = (high + low) / 2 # Center the range on zero
+            scale = (high - low) / QUANTIZE_LEVELS or 1.0 # Get the step of the quantization
+            data = np.rint((data - offset) / scale).astype(np.int16) # Quantize the data
+        else:
+            data = data.astype(self.dtype, copy=False) # Store the data with the codec dtype
+        dtype = data.dtype # Remember the stored dtype
+        if self.delta and data.ndim > 0 and data.shape[axis] > 0: # If the codec uses deltas, take the differences of the quantized values
+            data = np.diff(data, axis=axis, prepend=np.zeros_like(data.take([0], axis=axis))) # Take the differences (integer overflow wraps around)
+        data = np.ascontiguousarray(data).view(np.uint8) # Get the bytes of the data
+        if self.shuffle: # If the codec shuffles, group the n-th bytes of all the elements together
+            data = data.reshape((-1, dtype.itemsize)).T
+        data = data.tobytes() # Get the bytes in the (shuffled) order
+        data = COMPRESSORS[self.compressor][0](data, self.level) # Compress the bytes
+        flags = FLAG_SHUFFLE * self.shuffle | FLAG_DELTA * self.delta | FLAG_QUANTIZE * self.quantize # Get the flags of the codec
+        header = CODEC_HEADER.pack(CODEC_MAGIC, self.compressor, flags, self.level, axis, dtype.str.encode().ljust(4), len(shape), scale, offset, len(data)) # Pack the header
+        return header + b''.join(CODEC_DIM.pack(dim) for dim in shape) + data
+
+# Define the codecs by name
+CODECS = {
+    'raw': Codec(compressor=0, dtype=np.float64, shuffle=False), # float64 bytes, as before
+    'zlib': Codec(compressor=1), # Lossless float32 with byte shuffle and zlib
+    'lzma': Codec(compressor=2), # Lossless float32 with byte shuffle and lzma
+    'int16-zlib': Codec(compressor=1, quantize=True), # Lossy int16 with byte shuffle and zlib
+    'int16-delta-zlib': Codec(compressor=1, quantize=True, delta=True), # Lossy int16 with deltas along time, byte shuffle and zlib
+    'int16-delta-lzma': Codec(compressor=2, quantize=True, delta=True), # Lossy int16 with deltas along time, byte shuffle and lzma
+}
+
+# Define the function for registering a codec
+def register(name, codec):
+    # Make the codec available by name to the database and the socket layer
+    CODECS[name] = codec
+
+# Define the function for encoding an array
+def encode(data, codec=DEFAULT_CODEC):
+    # Encode the array with the codec given by name or as a Codec object
+    codec = CODECS[codec] if isinstance(codec, str) else codec # Look up the codec by name
+    return codec.encode(data)
+
+# Define the function for getting the size of the encoded array at an offset
+def size(data, offset=0):
+    # Read the header at the offset and get the number of bytes of the whole encoded array
+    if len(data) < offset + CODEC_HEADER.size or data[offset:offset + len(CODEC_MAGIC)] != CODEC_MAGIC: # If there is no header, refuse the data
+        raise ValueError(f'No encoded array at byte {offset}')
+    header = CODEC_HEADER.unpack_from(data, offset) # Unpack the header
+    return CODEC_HEADER.size + header[6] * CODEC_DIM.size + header[9] # Add the header, the shape and the payload
+
+# Define the function for splitting concatenated encoded arrays, e.g. messages read from one socket
+def split(data):
+    # Get the encoded arrays one by one, reading headerless bytes as one legacy message
+    data = bytes(data) # Make sure the data can be sliced into bytes
+    if not data.startswith(CODEC_MAGIC): # If the data has no header, it was written before the codecs existed
+        return [data] if data else []
+    messages = [] # Initialize the list of messages
+    offset = 0 # Initialize the offset of the next message
+    while offset < len(data):
+        end = offset + size(data, offset) # Get the end of the message
+        if end > len(data): # If the message is cut short, refuse it
+            raise ValueError(f'Encoded array at byte {offset} is {end - len(data)} bytes short')
+        messages.append(data[offset:end]) # Keep the message
+        offset = end # Move to the next message
+    return messages
+
+# Define the function for decoding an array
+def decode(data):
+    # Decode self-describing bytes into an array, reading headerless bytes as legacy float64
+    data = bytes(data) # Make sure the data can be sliced into bytes
+    if not data.startswith(CODEC_MAGIC): # If the data has no header, it was written before the codecs existed
+        return np.frombuffer(data, dtype=LEGACY_DTYPE)
+    if size(data) != len(data): # If the data is not exactly one encoded array, refuse it
+        raise ValueError(f'Encoded array has {size(data)} bytes, got {len(data)}')
+    magic, compressor, flags, level, axis, dtype, ndim, scale, offset, length = CODEC_HEADER.unpack_from(data) # Unpack the header
+    start = CODEC_HEADER.size + ndim * CODEC_DIM.size # Get the start of the payload
+    shape = tuple(CODEC_DIM.unpack_from(data, CODEC_HEADER.size + i * CODEC_DIM.size)[0] for i in range(ndim)) # Unpack the shape
+    dtype = np.dtype(dtype.strip().decode()) # Get the stored dtype
+    data = COMPRESSORS[compressor][1](data[start:]) # Decompress the payload
+    data = np.frombuffer(data, dtype=np.uint8) # Get the bytes of the payload
+    if flags & FLAG_SHUFFLE: # If the bytes were shuffled, put the bytes of each element back together
+        data = data.reshape((dtype.itemsize, -1)).T
+    data = np.ascontiguousarray(data).view(dtype).reshape(shape) # Get the stored array
+    if flags & FLAG_DELTA and ndim > 0: # If deltas were taken, sum them back up
+        view = data.view(f'<i{dtype.itemsize}') if dtype.kind == 'f' else data # Floats were differenced bit-wise by the first lossless delta codecs
+        data = np.cumsum(view, axis=axis, dtype=view.dtype).view(dtype) # Sum the differences (integer overflow wraps around)
+    if flags & FLAG_QUANTIZE: # If the data was quantized, map it back to floats
+        data = data * scale + offset
+    return data
@@ -7,6 +7,7 @@ import threading as th
 import brain_lib as bl
 import brain_ml as bm
 import brain_aug as ba
+import brain_codec as bz
 
 # Define the global variables and constants
 HOST = 'localhost' # The host address
@@ -14,20 +15,33 @@ PORT = 8080 # The port number
 BUFFER_SIZE = 4096 # The buffer size
 FORMAT = 'utf-8' # The encoding format
 SEPARATOR = '<SEP>' # The separator symbol
+WIRE_CODEC = 'zlib' # The codec of the arrays sent over the socket
+
+# Define the function for receiving a whole message from a connection
+def receive_all(conn):
+    # Receive the chunks of data until the sender closes the connection
+    chunks = [] # Initialize the list of chunks
+    while True:
+        chunk = conn.recv(BUFFER_SIZE) # Receive a chunk of data
+        if not chunk: # If no more data, break the loop
+            break
+        chunks.append(chunk) # Append the chunk to the list
+    return b''.join(chunks) # Join the chunks once
 
 # Define the class for communicating with the brain using EEG
 class BrainSender:
-    def __init__(self):
+    def __init__(self, device=None, codec=WIRE_CODEC):
         # Initialize the brain sender
-        self.augmentor = ba.EEGAugmentor() # Create an EEG augmentor object
+        self.augmentor = ba.EEGAugmentor(device) # Create an EEG augmentor object
+        self.codec = codec # The codec of the sent arrays
         self.socket = sk.socket(sk.AF_INET, sk.SOCK_STREAM) # Create a socket object
         self.socket.connect((HOST, PORT)) # Connect to the host and port
 
     def send(self, data):
         # Send the EEG data to the host
         data = self.augmentor.enhance(data) # Enhance the EEG data
-        data = data.tobytes() # Convert the data to bytes
-        self.socket.send(data) # Send the data to the socket
+        data = bz.encode(data, self.codec) # Encode the data to bytes
+        self.socket.sendall(data) # Send all the data to the socket, as the receiver checks the length in the header
 
     def close(self):
         # Close the brain sender
@@ -36,9 +50,9 @@ class BrainSender:
 
 # Define the class for communicating with the brain using fMRI
 class BrainReceiver:
-    def __init__(self):
+    def __init__(self, device=None):
         # Initialize the brain receiver
-        self.stimulator = ba.FMRIStimulator() # Create an fMRI stimulator object
+        self.stimulator = ba.FMRIStimulator(device) # Create an fMRI stimulator object
         self.socket = sk.socket(sk.AF_INET, sk.SOCK_STREAM) # Create a socket object
         self.socket.bind((HOST, PORT)) # Bind to the host and port
         self.socket.listen() # Listen for incoming connections
@@ -46,28 +60,29 @@ class BrainReceiver:
     def receive(self):
         # Receive the fMRI data from the host
         conn, addr = self.socket.accept() # Accept a connection
-        data = b'' # Initialize an empty byte string
-        while True:
-            chunk = conn.recv(BUFFER_SIZE) # Receive a chunk of data
-            if not chunk: # If no more data, break the loop
-                break
-            data += chunk # Append the chunk to the data
-        data = np.frombuffer(data, dtype=np.float64) # Convert the data from bytes to a numpy array
+        with conn:
+            data = receive_all(conn) # Receive the data until the connection is closed
+        data = [bz.decode(message).ravel() for message in bz.split(data)] # Decode each message sent on the connection
+        data = np.concatenate(data) if data else np.zeros(0) # Join the messages into one array
         data = self.stimulator.enhance(data) # Enhance the fMRI data
         return data
 
     def close(self):
         # Close the brain receiver
-        self.stimulator.close()
+        try:
+            self.socket.shutdown(sk.SHUT_RDWR) # Wake up a thread blocked in accept
+        except OSError: # If the socket is not connected, there is nothing to wake up
+            pass
         self.socket.close()
+        self.stimulator.close()
 
 # Define the class for communicating with the brain using optogenetics
 class BrainCommunicator:
-    def __init__(self):
+    def __init__(self, eeg_device=None, fmri_device=None, opto_device=None):
         # Initialize the brain communicator
-        self.emulator = ba.OptoEmulator() # Create an optogenetics emulator object
-        self.sender = BrainSender() # Create a brain sender object
-        self.receiver = BrainReceiver() # Create a brain receiver object
+        self.emulator = ba.OptoEmulator(opto_device) # Create an optogenetics emulator object
+        self.receiver = BrainReceiver(fmri_device) # Create a brain receiver object first, so the port is bound before the sender connects
+        self.sender = BrainSender(eeg_device) # Create a brain sender object
         self.thread = th.Thread(target=self.communicate) # Create a thread object
         self.thread.start() # Start the thread
 
@@ -1,14 +1,13 @@
 # Import the required libraries and modules
 import sqlite3 as sq
-import pandas as pd
+import numpy as np
 
-# Import the brain_lib, brain_ml, brain_aug, brain_enh, brain_com, and brain_norm modules
+# Import the brain_lib and brain_codec modules
 import brain_lib as bl
-import brain_ml as bm
-import brain_aug as ba
-import brain_enh as be
-import brain_com as bc
-import brain_norm as bn
+import brain_codec as bz
+
+# Import the heavy libraries and modules lazily, on first use
+pd = bl.lazy_import('pandas')
 
 # Define the global variables and constants
 DB_NAME = 'brain.db' # The name of the database file
@@ -17,11 +16,13 @@ FMRI_TABLE = 'fmri' # The name of the fMRI table
 OPTO_TABLE = 'opto' # The name of the optogenetics table
 QUERY_TABLE = 'query' # The name of the query table
 ANSWER_TABLE = 'answer' # The name of the answer table
+DB_CODEC = 'zlib' # The codec of the arrays stored in the BLOB tables
 
 # Define the class for storing and retrieving the brain data using a robust and scalable database
 class BrainDB:
-    def __init__(self):
+    def __init__(self, codec=DB_CODEC):
         # Initialize the brain database
+        self.codec = codec # The codec of the stored arrays
         self.connection = sq.connect(DB_NAME) # Create a connection object
         self.cursor = self.connection.cursor() # Create a cursor object
         self.create_tables() # Create the tables for the database
@@ -51,6 +52,8 @@ class BrainDB:
 
     def save(self, table, data):
         # Save the data to the table
+        if isinstance(data, np.ndarray): # If the data is an array, encode it (bytes are stored as they are)
+            data = bz.encode(data, self.codec)
         self.cursor.execute(f'INSERT INTO {table} (data) VALUES (?)', (data,)) # Insert the data to the table
         self.connection.commit() # Commit the changes
 
@@ -59,10 +62,20 @@ class BrainDB:
         self.cursor.execute(f'SELECT data FROM {table} WHERE id = ?', (id,)) # Select the data from the table
         data = self.cursor.fetchone() # Fetch the data
         if data: # If data exists, return the data
-            return data[0]
+            return self.decode(data[0])
         else: # If data does not exist, return None
             return None
 
+    def iterate(self, table):
+        # Iterate over the data of the table in the order it was saved
+        cursor = self.connection.cursor() # Create a separate cursor so other queries can run meanwhile
+        for row in cursor.execute(f'SELECT data FROM {table} ORDER BY id'): # Select the data from the table
+            yield self.decode(row[0])
+
+    def decode(self, data):
+        # Decode the data of a BLOB table into an array (text is returned as it is)
+        return bz.decode(data) if isinstance(data, bytes) else data
+
     def close(self):
         # Close the brain database
         self.connection.close() # Close the connection
@@ -1,84 +1,138 @@
 # Import the required libraries and modules
 import numpy as np
-import scipy.optimize as so
-import torch as th
-import huggingface as hf
 
 # Import the brain_lib, brain_ml, and brain_aug modules
 import brain_lib as bl
 import brain_ml as bm
 import brain_aug as ba
 
+# Import the heavy libraries and modules lazily, on first use
+so = bl.lazy_import('scipy.optimize')
+th = bl.lazy_import('torch')
+hf = bl.lazy_import('huggingface')
+
 # Define the global variables and constants
 MEMORY_SIZE = 1024 # The size of the memory buffer
 ATTENTION_SPAN = 12 # The span of the attention window
 CREATIVITY_FACTOR = 0.5 # The factor of the creativity score
 INTELLIGENCE_LEVEL = 0.8 # The level of the intelligence threshold
 
+# Define the function for appending a frame to a ring buffer that grows up to its size
+def ring_append(buffer, head, count, size, data):
+    # Store the data at the head, growing the buffer by doubling until it holds size frames
+    if count == len(buffer) and count < size: # If the buffer is full but smaller than its size, grow it
+        grown = np.zeros((min(max(2 * count, 1), size),) + buffer.shape[1:]) # Allocate the grown buffer
+        grown[:count] = buffer[:count] # Copy the stored frames
+        buffer = grown
+    buffer[head] = data # Store the data at the head
+    return buffer, (head + 1) % size, min(count + 1, size) # Move the head and count the frame
+
 # Define the class for enhancing the brain capabilities using EEG
 class MemoryEnhancer:
-    def __init__(self):
+    def __init__(self, device=None):
         # Initialize the memory enhancer
-        self.augmentor = ba.EEGAugmentor() # Create an EEG augmentor object
-        self.memory = np.zeros((MEMORY_SIZE, bl.EEG_CHANNELS, bl.EEG_SAMPLING_RATE * bl.EEG_DURATION)) # Create a memory buffer
+        self.augmentor = ba.EEGAugmentor(device) # Create an EEG augmentor object
+        self.reset_state() # Create an empty memory buffer
 
     def enhance(self, data):
         # Enhance the memory using EEG
         data = self.augmentor.augment(data) # Augment the EEG data
-        self.memory = np.roll(self.memory, -1, axis=0) # Shift the memory buffer by one
-        self.memory[-1] = data # Store the augmented EEG data in the memory buffer
+        self.remember(data) # Store the augmented EEG data in the memory buffer
         return data
 
+    def remember(self, data):
+        # Store the EEG data in the memory buffer, replacing the oldest memory once it is full
+        self.memory, self.head, self.count = ring_append(self.memory, self.head, self.count, MEMORY_SIZE, data)
+
     def recall(self, query):
         # Recall the memory using EEG
+        if self.count == 0: # If nothing is remembered yet, recall an empty memory
+            return np.zeros(self.memory.shape[1:])
         query = self.augmentor.preprocess(query) # Preprocess the query
         query = query.reshape((1, -1)) # Reshape the query to a 2D array
-        memory = self.memory.reshape((MEMORY_SIZE, -1)) # Reshape the memory to a 2D array
+        memory = self.memory[:self.count].reshape((self.count, -1)) # Reshape the stored memories to a 2D array
         scores = np.dot(memory, query.T) # Compute the cosine similarity scores
         index = np.argmax(scores) # Get the index of the most similar memory
         data = self.memory[index] # Get the corresponding memory
         return data
 
+    def state_dict(self, copy=True):
+        # Get the subject state of the memory enhancer (shared instead of copied if copy is False)
+        return {'memory': self.memory.copy() if copy else self.memory, 'head': np.array(self.head), 'count': np.array(self.count)}
+
+    def load_state_dict(self, state, copy=True):
+        # Restore the subject state of the memory enhancer (adopted instead of copied if copy is False)
+        self.memory = np.array(state['memory'], np.float64) if copy else np.require(state['memory'], np.float64, ['C', 'W']) # Restore the memory buffer (copy only if read-only)
+        self.head = int(state['head']) # Restore the head of the memory buffer
+        self.count = int(state['count']) # Restore the number of stored memories
+
+    def reset_state(self):
+        # Reset the subject state of the memory enhancer, allocating the memory buffer as it fills
+        self.memory = np.zeros((0, bl.EEG_CHANNELS, bl.EEG_SAMPLING_RATE * bl.EEG_DURATION)) # Create an empty memory buffer
+        self.head = 0 # Initialize the head of the memory buffer
+        self.count = 0 # Initialize the number of stored memories
+
     def close(self):
         # Close the memory enhancer
         self.augmentor.close()
 
 # Define the class for enhancing the brain capabilities using fMRI
 class AttentionEnhancer:
-    def __init__(self):
+    def __init__(self, device=None):
         # Initialize the attention enhancer
-        self.stimulator = ba.FMRIStimulator() # Create an fMRI stimulator object
-        self.attention = np.zeros((ATTENTION_SPAN, bl.FMRI_SHAPE[0] * bl.FMRI_SHAPE[1] * bl.FMRI_SHAPE[2])) # Create an attention window
+        self.stimulator = ba.FMRIStimulator(device) # Create an fMRI stimulator object
+        self.reset_state() # Create an empty attention window
 
     def enhance(self, data):
         # Enhance the attention using fMRI
         data = self.stimulator.load(data) # Load the fMRI data from a file
-        self.attention = np.roll(self.attention, -1, axis=0) # Shift the attention window by one
-        self.attention[-1] = data # Store the fMRI data in the attention window
-        data = np.mean(self.attention, axis=0) # Compute the mean of the attention window
+        data = self.attend(data) # Store the fMRI data in the attention window
         self.stimulator.stimulate(data) # Stimulate the fMRI data to the device
         return data
 
+    def attend(self, data):
+        # Store the fMRI data in the attention window and get the mean of the window
+        self.attention, self.head, self.count = ring_append(self.attention, self.head, self.count, ATTENTION_SPAN, data)
+        return np.sum(self.attention[:self.count], axis=0) / ATTENTION_SPAN # Compute the mean of the attention window (empty slots count as zeros)
+
     def focus(self, query):
         # Focus the attention using fMRI
+        if self.count == 0: # If nothing is attended yet, focus on an empty volume
+            return np.zeros(self.attention.shape[1:])
         query = self.stimulator.preprocess(query) # Preprocess the query
         query = query.reshape((1, -1)) # Reshape the query to a 2D array
-        attention = self.attention # Get the attention window
+        attention = self.attention[:self.count] # Get the filled part of the attention window
         scores = np.dot(attention, query.T) # Compute the cosine similarity scores
         index = np.argmax(scores) # Get the index of the most similar attention
         data = self.attention[index] # Get the corresponding attention
         return data
 
+    def state_dict(self, copy=True):
+        # Get the subject state of the attention enhancer (shared instead of copied if copy is False)
+        return {'attention': self.attention.copy() if copy else self.attention, 'head': np.array(self.head), 'count': np.array(self.count)}
+
+    def load_state_dict(self, state, copy=True):
+        # Restore the subject state of the attention enhancer (adopted instead of copied if copy is False)
+        self.attention = np.array(state['attention'], np.float64) if copy else np.require(state['attention'], np.float64, ['C', 'W']) # Restore the attention window (copy only if read-only)
+        self.head = int(state['head']) # Restore the head of the attention window
+        self.count = int(state['count']) # Restore the number of attended volumes
+
+    def reset_state(self):
+        # Reset the subject state of the attention enhancer, allocating the attention window as it fills
+        self.attention = np.zeros((0, bl.FMRI_SHAPE[0] * bl.FMRI_SHAPE[1] * bl.FMRI_SHAPE[2])) # Create an empty attention window
+        self.head = 0 # Initialize the head of the attention window
+        self.count = 0 # Initialize the number of attended volumes
+
     def close(self):
         # Close the attention enhancer
         self.stimulator.close()
 
 # Define the class for enhancing the brain capabilities using optogenetics
 class CreativityEnhancer:
-    def __init__(self):
+    def __init__(self, device=None):
         # Initialize the creativity enhancer
-        self.emulator = ba.OptoEmulator() # Create an optogenetics emulator object
-        self.creativity = 0 # Initialize the creativity score
+        self.emulator = ba.OptoEmulator(device) # Create an optogenetics emulator object
+        self.reset_state() # Initialize the creativity score
 
     def enhance(self, data):
         # Enhance the creativity using optogenetics
@@ -102,17 +156,29 @@ class CreativityEnhancer:
         data = data[index] # Get the corresponding data
         return data
 
+    def state_dict(self, copy=True):
+        # Get the subject state of the creativity enhancer
+        return {'creativity': np.array(self.creativity)}
+
+    def load_state_dict(self, state, copy=True):
+        # Restore the subject state of the creativity enhancer
+        self.creativity = float(state['creativity'])
+
+    def reset_state(self):
+        # Reset the subject state of the creativity enhancer
+        self.creativity = 0
+
     def close(self):
         # Close the creativity enhancer
         self.emulator.close()
 
 # Define the class for enhancing the brain capabilities using all techniques
 class IntelligenceEnhancer:
-    def __init__(self):
+    def __init__(self, eeg_device=None, fmri_device=None, opto_device=None):
         # Initialize the intelligence enhancer
-        self.memory = MemoryEnhancer() # Create a memory enhancer object
-        self.attention = AttentionEnhancer() # Create an attention enhancer object
-        self.creativity = CreativityEnhancer() # Create a creativity enhancer object
+        self.memory = MemoryEnhancer(eeg_device) # Create a memory enhancer object
+        self.attention = AttentionEnhancer(fmri_device) # Create an attention enhancer object
+        self.creativity = CreativityEnhancer(opto_device) # Create a creativity enhancer object
 
     def enhance(self, data):
         # Enhance the intelligence using all techniques
@@ -128,6 +194,22 @@ class IntelligenceEnhancer:
         query = self.creativity.generate(query) # Generate the creativity using optogenetics
         return query
 
+    def state_dict(self, copy=True):
+        # Get the subject state of the intelligence enhancer
+        return bl.nest_state(memory=self.memory.state_dict(copy), attention=self.attention.state_dict(copy), creativity=self.creativity.state_dict(copy))
+
+    def load_state_dict(self, state, copy=True):
+        # Restore the subject state of the intelligence enhancer
+        self.memory.load_state_dict(bl.split_state(state, 'memory'), copy)
+        self.attention.load_state_dict(bl.split_state(state, 'attention'), copy)
+        self.creativity.load_state_dict(bl.split_state(state, 'creativity'), copy)
+
+    def reset_state(self):
+        # Reset the subject state of the intelligence enhancer
+        self.memory.reset_state()
+        self.attention.reset_state()
+        self.creativity.reset_state()
+
     def close(self):
         # Close the intelligence enhancer
         self.memory.close()
@@ -1,7 +1,11 @@
 # Import the required libraries and modules
+import os
+import time
+import queue
+import threading
+import concurrent.futures as cf
+import numpy as np
 import tkinter as tk
-import PIL.Image as pi
-import PIL.ImageTk as pit
 
 # Import the brain_lib, brain_ml, brain_aug, brain_enh, brain_com, and brain_norm modules
 import brain_lib as bl
@@ -11,6 +15,10 @@ import brain_enh as be
 import brain_com as bc
 import brain_norm as bn
 
+# Import the heavy libraries and modules lazily, on first use
+pi = bl.lazy_import('PIL.Image')
+pit = bl.lazy_import('PIL.ImageTk')
+
 # Define the global variables and constants
 WINDOW_TITLE = 'Brain-Computer Interface System' # The title of the window
 WINDOW_WIDTH = 800 # The width of the window
@@ -34,19 +42,167 @@ TEXT_BACKGROUND = 'white' # The background color of the text boxes
 TEXT_FOREGROUND = 'black' # The foreground color of the text boxes
 IMAGE_WIDTH = 200 # The width of the images
 IMAGE_HEIGHT = 200 # The height of the images
+PLOT_WIDTH = 180 # The width of the live plots
+PLOT_HEIGHT = 90 # The height of the live plots
+PLOT_BACKGROUND = 'black' # The background color of the live plots
+PLOT_FOREGROUND = 'light green' # The color of the traces in the live plots
+PLOT_LENGTH = 360 # The number of points kept in the ring buffer of a live plot
+PLOT_DECIMATION = 16 # Keep one sample out of this many before plotting
+PLOT_CHANNELS = 8 # The number of EEG channels drawn in the live plot
+PLOT_FPS = 20 # The maximum number of redraws per second of a live plot
+POLL_INTERVAL = 15 # Milliseconds between two polls of the result queue
+POLL_BUDGET = 50 # The maximum number of results handled per poll
+WORKER_THREADS = 2 # The number of worker threads for the short pipeline calls (streaming and receiving run on threads of their own)
 
 # Define the class for displaying and controlling the system using a user-friendly and interactive GUI
 class BrainGUI:
-    def __init__(self):
+    def __init__(self, loader=None):
         # Initialize the brain GUI
         self.window = tk.Tk() # Create a window object
         self.window.title(WINDOW_TITLE) # Set the title of the window
         self.window.geometry(f'{WINDOW_WIDTH}x{WINDOW_HEIGHT}') # Set the size of the window
-        self.window.iconbitmap(WINDOW_ICON) # Set the icon of the window
+        if os.path.exists(WINDOW_ICON): # If the icon file is there, set the icon of the window
+            self.window.iconbitmap(WINDOW_ICON)
         self.window.config(bg=WINDOW_BACKGROUND) # Set the background color of the window
-        self.controller = BrainController() # Create a brain controller object
-        self.viewer = BrainViewer() # Create a brain viewer object
+        self.controller = None # The brain controller is loaded in the background
+        self.error = None # The error of the loading, if it failed
+        self.results = queue.Queue() # Create the queue of results flowing back to the window
+        self.streaming = threading.Event() # Create the flag of the streaming loop
+        self.receiving = threading.Event() # Create the flag of the pending receive
+        self.executor = cf.ThreadPoolExecutor(max_workers=WORKER_THREADS) # Create the pool of pipeline workers
         self.create_widgets() # Create the widgets for the window
+        self.viewer = BrainViewer(self.window) # Create a brain viewer object with the live plots
+        self.set_ready(False) # Disable the pipeline buttons until the controller is loaded
+        self.executor.submit(self.load, loader or BrainController) # Load the heavy components in the background
+        self.window.after(POLL_INTERVAL, self.poll) # Start polling the result queue
+
+    def load(self, loader):
+        # Load the brain controller on a worker thread
+        try:
+            self.results.put(('ready', loader())) # Hand the controller over to the window
+        except Exception as error: # If the loading failed, report it on the window
+            self.results.put(('failed', error))
+
+    def task(self, kind, function, *args):
+        # Call a pipeline function and queue its result
+        try:
+            self.results.put((kind, function(*args))) # Queue the result for the window
+        except Exception as error: # If the function failed, report it on the window
+            self.results.put(('error', error))
+
+    def run(self, kind, function, *args):
+        # Run a short pipeline function on a worker thread and queue its result
+        return self.executor.submit(self.task, kind, function, *args)
+
+    def spawn(self, kind, function, *args):
+        # Run a long-lived or blocking pipeline function on a thread of its own, so it cannot starve the worker pool
+        thread = threading.Thread(target=self.task, args=(kind, function, *args), daemon=True) # Create the thread
+        thread.start() # Start the thread
+        return thread
+
+    def poll(self):
+        # Handle the queued results on the main loop and redraw the live plots
+        for _ in range(POLL_BUDGET): # Bound the work done per poll to keep the window responsive
+            try:
+                kind, value = self.results.get_nowait() # Get the next result
+            except queue.Empty: # If there are no more results, stop
+                break
+            self.handle(kind, value) # Handle the result
+        self.viewer.draw() # Redraw the live plots at a capped frame rate
+        self.window.after(POLL_INTERVAL, self.poll) # Schedule the next poll
+
+    def handle(self, kind, value):
+        # Handle a result from the worker threads
+        if kind == 'ready':
+            self.controller = value # Keep the loaded controller
+            self.set_ready(True) # Enable the pipeline buttons
+        elif kind == 'eeg':
+            self.viewer.eeg_plot.push(value) # Append the decimated EEG data to the live plot
+        elif kind == 'fmri':
+            self.viewer.fmri_plot.push(value) # Append the decimated fMRI data to the live plot
+        elif kind == 'opto':
+            self.opto_text.insert(tk.END, f'{value}\n') # Show the optogenetics result
+        elif kind == 'answer':
+            self.answer_text.delete('1.0', tk.END) # Clear the previous answer
+            self.answer_text.insert(tk.END, f'{value}\n') # Show the answer
+        elif kind == 'failed':
+            self.error = value # Keep the error of the loading
+            self.answer_text.insert(tk.END, f'Loading failed: {value}\n') # Show the error
+        elif kind == 'error':
+            self.answer_text.insert(tk.END, f'Error: {value}\n') # Show the error
+
+    def set_ready(self, ready):
+        # Enable or disable the buttons that need the brain controller
+        state = tk.NORMAL if ready else tk.DISABLED # Choose the state of the buttons
+        for button in (self.start_button, self.send_button, self.receive_button, self.solve_button):
+            button.config(state=state)
+
+    def stream(self):
+        # Stream the EEG and fMRI data through the pipeline on a thread of its own
+        try:
+            while self.streaming.is_set():
+                eeg = self.controller.eeg() # Read and normalize the EEG data
+                self.results.put(('eeg', decimate(eeg[:PLOT_CHANNELS]))) # Queue the decimated EEG channels
+                fmri = self.controller.fmri() # Read and validate the fMRI data
+                self.results.put(('fmri', np.mean(np.reshape(fmri, (-1, bl.FMRI_SHAPE[0] * bl.FMRI_SHAPE[1] * bl.FMRI_SHAPE[2])), axis=1)[None, :])) # Queue the mean fMRI activity
+        finally:
+            self.streaming.clear() # Allow the streaming to be started again
+
+    def start(self):
+        # Start streaming the data through the pipeline
+        if not self.streaming.is_set(): # If the pipeline is not streaming yet, start it
+            self.streaming.set()
+            self.spawn('stream', self.stream)
+
+    def stop(self):
+        # Stop streaming the data through the pipeline
+        self.streaming.clear()
+
+    def send(self):
+        # Send the EEG entry through the pipeline, parsing it on the worker so that bad input is reported as an error
+        entry = self.eeg_entry.get() # Read the EEG entry on the window thread
+        self.run('eeg', lambda: decimate(self.controller.send(np.array(entry.split(), dtype=float)))[:PLOT_CHANNELS])
+
+    def receive(self):
+        # Receive the fMRI data through the pipeline on a thread of its own, as it blocks until a sender closes its connection
+        if not self.receiving.is_set(): # If no receive is pending yet, start one
+            self.receiving.set()
+            self.spawn('fmri', self.receive_mean)
+
+    def receive_mean(self):
+        # Receive the fMRI data and get its mean activity
+        try:
+            return np.mean(self.controller.receive(), keepdims=True)[None, :]
+        finally:
+            self.receiving.clear() # Allow the next receive
+
+    def solve(self):
+        # Solve the query entry through the pipeline
+        self.run('answer', self.controller.solve, self.query_entry.get())
+
+    def clear(self):
+        # Clear the entries, the text boxes and the live plots
+        for entry in (self.eeg_entry, self.fmri_entry, self.opto_entry, self.query_entry):
+            entry.delete(0, tk.END)
+        for text in (self.opto_text, self.answer_text):
+            text.delete('1.0', tk.END)
+        self.viewer.clear()
+
+    def exit(self):
+        # Exit the main loop of the window
+        self.stop()
+        self.window.quit()
+
+    def close(self):
+        # Close the brain GUI
+        self.stop() # Stop the streaming loop
+        if self.controller is not None: # If the controller was loaded, close it first, so blocked socket calls return
+            self.controller.close()
+        self.executor.shutdown(wait=False, cancel_futures=True) # Do not wait for the work in flight
+        try:
+            self.window.destroy() # Destroy the window
+        except tk.TclError: # If the window manager already destroyed the window, there is nothing left to destroy
+            pass
 
     def create_widgets(self):
         # Create the widgets for the window
@@ -98,11 +254,7 @@ class BrainGUI:
         self.query_entry.place(x=50, y=350) # Place the query entry
 
     def create_textboxes(self):
-        # Create the text boxes for the window
-        self.eeg_text = tk.Text(self.window, width=TEXT_WIDTH, height=TEXT_HEIGHT, bg=TEXT_BACKGROUND, fg=TEXT_FOREGROUND) # Create an EEG text box
-        self.eeg_text.place(x=50, y=200) # Place the EEG text box
-        self.fmri_text = tk.Text(self.window, width=TEXT_WIDTH, height=TEXT_HEIGHT, bg=TEXT_BACKGROUND, fg=TEXT_FOREGROUND) # Create an fMRI text box
-        self.fmri_text.place(x=250, y=200) # Place the fMRI text box
+        # Create the text boxes for the window (the EEG and fMRI panels are live plots of the brain viewer)
         self.opto_text = tk.Text(self.window, width=TEXT_WIDTH, height=TEXT_HEIGHT, bg=TEXT_BACKGROUND, fg=TEXT_FOREGROUND) # Create an optogenetics text box
         self.opto_text.place(x=450, y=200) # Place the optogenetics text box
         self.answer_text = tk.Text(self.window, width=TEXT_WIDTH, height=TEXT_HEIGHT, bg=TEXT_BACKGROUND, fg=TEXT_FOREGROUND) # Create an answer text box
@@ -111,6 +263,8 @@ class BrainGUI:
     def create_images(self):
         # Create the images for the window
         # Create the images for the window
+        if not all(os.path.exists(filename) for filename in ('eeg.png', 'fmri.png', 'opto.png')): # If the image files are missing (e.g. a headless run), skip the images
+            return
         self.eeg_image = pi.open('eeg.png') # Open the EEG image file
         self.eeg_image = self.eeg_image.resize((IMAGE_WIDTH, IMAGE_HEIGHT), pi.ANTIALIAS) # Resize the EEG image
         self.eeg_image = pit.PhotoImage(self.eeg_image) # Convert the EEG image to a PhotoImage
@@ -126,3 +280,114 @@ class BrainGUI:
         self.opto_image = pit.PhotoImage(self.opto_image) # Convert the optogenetics image to a PhotoImage
         self.opto_label = tk.Label(self.window, image=self.opto_image) # Create an optogenetics image label
         self.opto_label.place(x=250, y=400) # Place the optogenetics image label
+
+# Define the function for decimating a block of samples before plotting
+def decimate(data):
+    # Keep one sample out of PLOT_DECIMATION along the time axis
+    data = np.atleast_2d(data) # Make sure the data has a channel axis
+    return np.ascontiguousarray(data[:, ::PLOT_DECIMATION]) # Copy only the kept samples
+
+# Define the class for plotting a live signal from a ring buffer
+class LivePlot:
+    def __init__(self, window, x, y, channels):
+        # Initialize the live plot
+        self.canvas = tk.Canvas(window, width=PLOT_WIDTH, height=PLOT_HEIGHT, bg=PLOT_BACKGROUND, highlightthickness=0) # Create the canvas
+        self.canvas.place(x=x, y=y) # Place the canvas
+        self.buffer = np.zeros((channels, PLOT_LENGTH)) # Create the ring buffer
+        self.head = 0 # Initialize the write position in the ring buffer
+        self.dirty = False # Initialize the flag of pending changes
+        self.last = 0 # Initialize the time of the last redraw
+        self.xs = np.linspace(0, PLOT_WIDTH, PLOT_LENGTH) # Precompute the x coordinates of the points
+        self.offsets = (np.arange(channels) + 0.5) * PLOT_HEIGHT / channels # Precompute the vertical offset of each channel
+        self.scale = 0.5 * PLOT_HEIGHT / channels # The vertical scale of each channel
+        self.lines = [self.canvas.create_line(0, 0, 0, 0, fill=PLOT_FOREGROUND) for _ in range(channels)] # Create one trace per channel
+
+    def push(self, data):
+        # Append a block of (already decimated) samples to the ring buffer
+        data = np.atleast_2d(data)[:, -PLOT_LENGTH:] # Keep at most one buffer of samples
+        n = data.shape[1] # Get the number of new samples
+        end = self.head + n # Get the end of the write
+        if end <= PLOT_LENGTH: # If the write fits before the end of the buffer, copy it at once
+            self.buffer[:, self.head:end] = data
+        else: # If the write wraps around, copy it in two parts
+            split = PLOT_LENGTH - self.head
+            self.buffer[:, self.head:] = data[:, :split]
+            self.buffer[:, :end - PLOT_LENGTH] = data[:, split:]
+        self.head = end % PLOT_LENGTH # Move the write position
+        self.dirty = True # Mark the plot for a redraw
+
+    def draw(self, now=None):
+        # Redraw the traces if there are new samples and the frame interval has passed
+        now = time.perf_counter() if now is None else now # Get the current time
+        if not self.dirty or now - self.last < 1 / PLOT_FPS: # If there is nothing new or it is too early, skip the redraw
+            return
+        data = np.concatenate((self.buffer[:, self.head:], self.buffer[:, :self.head]), axis=1) # Unroll the ring buffer
+        peak = np.max(np.abs(data)) or 1 # Get the peak amplitude for the scaling
+        ys = self.offsets[:, None] - data * (self.scale / peak) # Compute the y coordinates of the points
+        for line, y in zip(self.lines, ys):
+            self.canvas.coords(line, *np.column_stack((self.xs, y)).ravel().tolist()) # Move the trace
+        self.dirty = False # Clear the flag of pending changes
+        self.last = now # Remember the time of the redraw
+
+    def clear(self):
+        # Clear the ring buffer and the traces
+        self.buffer[:] = 0
+        self.head = 0
+        self.dirty = True
+
+# Define the class for viewing the brain data as live plots
+class BrainViewer:
+    def __init__(self, window):
+        # Initialize the brain viewer
+        self.eeg_plot = LivePlot(window, 50, 200, PLOT_CHANNELS) # Create the live EEG plot
+        self.fmri_plot = LivePlot(window, 250, 200, 1) # Create the live plot of the mean fMRI activity
+
+    def draw(self):
+        # Redraw the live plots
+        now = time.perf_counter() # Use the same time for both plots
+        self.eeg_plot.draw(now)
+        self.fmri_plot.draw(now)
+
+    def clear(self):
+        # Clear the live plots
+        self.eeg_plot.clear()
+        self.fmri_plot.clear()
+
+# Define the class for controlling the system through the pipeline
+class BrainController:
+    def __init__(self):
+        # Initialize the brain controller, loading the models and opening the devices
+        self.normalizer = bn.BrainNormalizer() # Create a brain normalizer object
+        self.validator = bn.BrainValidator() # Create a brain validator object
+        self.intelligence = be.IntelligenceEnhancer() # Create an intelligence enhancer object
+        self.receiver = bc.BrainReceiver() # Create a brain receiver object (listening before the sender connects)
+        self.sender = bc.BrainSender() # Create a brain sender object
+
+    def eeg(self, data=None):
+        # Read and normalize the EEG data
+        return self.normalizer.normalize(data)
+
+    def fmri(self, data=None):
+        # Read and validate the fMRI data
+        return self.validator.validate(data)
+
+    def send(self, data):
+        # Send the EEG data to the host
+        self.sender.send(data)
+        return data
+
+    def receive(self):
+        # Receive the fMRI data from the host
+        return self.receiver.receive()
+
+    def solve(self, query):
+        # Solve the query using all techniques
+        return self.intelligence.solve(query)
+
+    def close(self):
+        # Close the brain controller, closing the sockets first so blocked calls return
+        self.sender.close()
+        self.receiver.close()
+        self.normalizer.close()
+        self.validator.close()
+        self.intelligence.close()
@@ -1,8 +1,29 @@
 # Import the required libraries and modules
+import importlib
 import numpy as np
-import scipy.io as sio
-import nibabel as nib
-import pyopto as po
+
+# Define the class for importing a heavy library or module on first use
+class LazyModule:
+    def __init__(self, name):
+        # Initialize the lazy module without importing it
+        self.name = name # The full name of the module
+        self.module = None # The module, once it is imported
+
+    def __getattr__(self, attr):
+        # Import the module on first attribute access and forward the access to it
+        if self.module is None: # If the module is not imported yet, import it now
+            self.module = importlib.import_module(self.name)
+        return getattr(self.module, attr)
+
+# Define the function for importing a heavy library or module lazily
+def lazy_import(name):
+    # Return a placeholder that imports the module on first use
+    return LazyModule(name)
+
+# Import the heavy libraries and modules lazily, on first use
+sio = lazy_import('scipy.io') # Used for saving the EEG data
+nib = lazy_import('nibabel') # Used for the NIfTI images
+po = lazy_import('pyopto') # Used for the device drivers
 
 # Define the global variables and constants
 EEG_SAMPLING_RATE = 256 # Hz
@@ -14,6 +35,25 @@ FMRI_DURATION = 300 # Seconds
 OPTO_WAVELENGTH = 470 # nm
 OPTO_POWER = 10 # mW
 OPTO_DURATION = 5 # Seconds
+EEG_DEVICE = 'eeg_device' # The name of the EEG device
+FMRI_DEVICE = 'fmri_device' # The name of the fMRI device
+OPTO_DEVICE = 'opto_device' # The name of the optogenetics device
+
+# Define the function for nesting the states of several objects into one flat state
+def nest_state(**states):
+    # Prefix the keys of each state with its name, so the state can be saved with np.savez
+    return {f'{name}.{key}': value for name, state in states.items() for key, value in state.items()}
+
+# Define the function for getting the state of one object out of a nested state
+def split_state(state, name):
+    # Keep the keys with the name as prefix, without the prefix
+    prefix = f'{name}.' # The prefix of the keys of the object
+    return {key[len(prefix):]: value for key, value in state.items() if key.startswith(prefix)}
+
+# Define the function for opening a device by name
+def open_device(name):
+    # Open the device through the PyOpto driver
+    return po.Device(name)
 
 # Define the class for measuring the brain activity using EEG
 class EEGReader:
@@ -46,6 +86,12 @@ class FMRIWriter:
         self.device.connect()
         self.device.start()
 
+    def read(self):
+        # Read an fMRI volume from the device
+        data = self.device.read(*FMRI_SHAPE) # Read the volume from the device
+        data = np.asarray(data).flatten() # Flatten the data to a 1D array
+        return data
+
     def write(self, data):
         # Write the fMRI data to the device
         data = np.array(data) # Convert the data to a numpy array
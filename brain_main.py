@@ -1,23 +1,17 @@
 # Import the required libraries and modules
 import sys
+import argparse
 
-# Import the brain_lib, brain_ml, brain_aug, brain_enh, brain_com, brain_norm, brain_gui, and brain_db modules
-import brain_lib as bl
-import brain_ml as bm
-import brain_aug as ba
-import brain_enh as be
-import brain_com as bc
-import brain_norm as bn
-import brain_gui as bg
-import brain_db as bd
+# The brain modules are imported inside the subcommands, so that each subcommand only loads what it uses
 
 # Define the global variables and constants
-EEG_DEVICE = 'eeg_device' # The name of the EEG device
-FMRI_DEVICE = 'fmri_device' # The name of the fMRI device
-OPTO_DEVICE = 'opto_device' # The name of the optogenetics device
+RECORD_CHUNKS = 6 # The number of EEG recordings made by the record subcommand
+
+# Define the function for running the GUI
+def gui(args):
+    # Import the brain_gui module
+    import brain_gui as bg
 
-# Define the main function to run the system
-def main():
     # Create a brain GUI object
     gui = bg.BrainGUI()
 
@@ -27,6 +21,121 @@ def main():
     # Close the brain GUI object
     gui.close()
 
+# Define the function for recording the EEG data to the database
+def record(args):
+    # Import the brain_lib and brain_db modules
+    import brain_lib as bl
+    import brain_db as bd
+
+    # Open the EEG reader and the database
+    reader = bl.EEGReader(bl.open_device(args.device or bl.EEG_DEVICE))
+    db = bd.BrainDB()
+
+    # Read the EEG data and save it to the database
+    for _ in range(args.chunks):
+        db.save(bd.EEG_TABLE, reader.read())
+
+    # Close the EEG reader and the database
+    reader.close()
+    db.close()
+
+# Define the function for replaying a recorded session over the socket
+def replay(args):
+    # Import the brain_com, brain_replay, and brain_codec modules
+    import socket
+    import brain_com as bc
+    import brain_replay as br
+    import brain_codec as bz
+
+    # Open the recorded session as a device
+    device = br.open_session(args.source, speed=args.speed)
+    device.connect()
+    device.start()
+
+    # Send each frame as one message, the way BrainSender does
+    try:
+        while True:
+            data = device.read() # Read the next frame at the replay speed
+            with socket.create_connection((bc.HOST, bc.PORT)) as conn:
+                conn.sendall(bz.encode(data, args.codec))
+    except EOFError: # If the session is over, stop (errors of the source propagate)
+        pass
+    finally:
+        # Close the recorded session
+        device.stop()
+        device.disconnect()
+    print(device.throughput())
+
+# Define the function for serving the socket and storing the received data
+def serve(args):
+    # Import the brain_com, brain_db, and brain_codec modules
+    import socket
+    import brain_com as bc
+    import brain_db as bd
+    import brain_codec as bz
+
+    # Open the database and the listening socket
+    db = bd.BrainDB()
+    server = socket.create_server((bc.HOST, bc.PORT))
+
+    # Store each received message in the database (encoded messages are stored without decoding them)
+    try:
+        while True:
+            conn, addr = server.accept()
+            with conn:
+                for message in bz.split(bc.receive_all(conn)): # Store each message sent on the connection
+                    db.save(args.table, message)
+    except KeyboardInterrupt:
+        pass
+
+    # Close the listening socket and the database
+    server.close()
+    db.close()
+
+# Define the function for running the benchmarks
+def bench(args):
+    # Import the brain_bench module
+    import brain_bench as bb
+
+    # Run the selected benchmarks
+    bb.main(args.names)
+
+# Define the function for parsing the command line
+def parse(argv):
+    # Create the parser with one subparser per subcommand
+    parser = argparse.ArgumentParser(description='Brain-Computer Interface System')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('gui', help='run the GUI (default)').set_defaults(function=gui)
+    parser_record = commands.add_parser('record', help='record EEG data to the database')
+    parser_record.add_argument('--device', help='the name of the EEG device (default: brain_lib.EEG_DEVICE)')
+    parser_record.add_argument('--chunks', type=int, default=RECORD_CHUNKS, help='the number of recordings')
+    parser_record.set_defaults(function=record)
+    parser_replay = commands.add_parser('replay', help='replay a recorded session over the socket')
+    parser_replay.add_argument('--source', default='eeg', help='a .mat or NIfTI file, or a table of the database')
+    parser_replay.add_argument('--speed', type=float, default=1.0, help='the multiple of real time (0 for as fast as possible)')
+    parser_replay.add_argument('--codec', default='zlib', help='the codec of the sent arrays')
+    parser_replay.set_defaults(function=replay)
+    parser_serve = commands.add_parser('serve', help='store the data received over the socket')
+    parser_serve.add_argument('--table', default='eeg', help='the table the data is stored in')
+    parser_serve.set_defaults(function=serve)
+    parser_bench = commands.add_parser('bench', help='run the benchmarks')
+    parser_bench.add_argument('names', nargs='*', help='the benchmarks to run (all by default)')
+    parser_bench.set_defaults(function=bench)
+    parser.set_defaults(function=gui)
+    args = parser.parse_args(argv)
+    if args.command == 'bench': # If benchmarks are named, check them against the benchmark suite
+        import brain_bench as bb
+        unknown = [name for name in args.names if name not in bb.BENCHMARKS] # Get the unknown names
+        if unknown: # If a name is unknown, exit with a usage error instead of a traceback
+            parser_bench.error(f'invalid choice: {", ".join(unknown)} (choose from {", ".join(bb.BENCHMARKS)})')
+    return args
+
+# Define the main function to run the system
+def main(argv=None):
+    # Run the selected subcommand
+    args = parse(sys.argv[1:] if argv is None else argv)
+    args.function(args)
+
 # Run the main function if the script is executed
 if __name__ == '__main__':
     main()
@@ -1,13 +1,15 @@
 # Import the required libraries and modules
 import numpy as np
-import scipy.signal as ss
-import sklearn as sk
-import torch as th
-import huggingface as hf
 
 # Import the brain_lib module
 import brain_lib as bl
 
+# Import the heavy libraries and modules lazily, on first use
+ss = bl.lazy_import('scipy.signal')
+sk = bl.lazy_import('sklearn')
+th = bl.lazy_import('torch')
+hf = bl.lazy_import('huggingface')
+
 # Define the global variables and constants
 EEG_FEATURES = 128 # Number of features for EEG classification
 EEG_CLASSES = 4 # Number of classes for EEG classification
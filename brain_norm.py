@@ -1,8 +1,11 @@
 # Import the required libraries and modules
+import hashlib
+import queue
+import threading
+import functools
+import collections
+import concurrent.futures as cf
 import numpy as np
-import scipy.stats as st
-import sklearn as sk
-import huggingface as hf
 
 # Import the brain_lib, brain_ml, brain_aug, and brain_enh modules
 import brain_lib as bl
@@ -10,77 +13,489 @@ import brain_ml as bm
 import brain_aug as ba
 import brain_enh as be
 
+# Import the heavy libraries and modules lazily, on first use
+st = bl.lazy_import('scipy.stats')
+sk = bl.lazy_import('sklearn')
+th = bl.lazy_import('torch')
+hf = bl.lazy_import('huggingface')
+
 # Define the global variables and constants
-NORMALIZATION_FACTOR = 0.1 # The factor of the normalization
-VALIDATION_THRESHOLD = 0.9 # The threshold of the validation
+NORMALIZATION_CLIP = 4.0 # The number of standard deviations the EEG data is clipped at (None does not clip)
+VALIDATION_CLIP = 4.0 # The number of standard deviations of the fMRI data mapped onto the range [0, 1]
 ETHICS_MODEL = 'distilbert-base-uncased-finetuned-sst-2-english' # Pre-trained model for ethics
+STATS_MODE = 'welford' # The update rule of the running statistics ('welford' or 'ema')
+STATS_ALPHA = 0.05 # The smoothing factor of the EMA running statistics
+STATS_EPSILON = 1e-8 # The floor of the running standard deviation
+ETHICS_BATCH_SIZE = 16 # The maximum number of inputs scored in one forward pass
+ETHICS_BATCH_WAIT = 0.005 # Seconds to wait for more inputs before running a partial batch
+ETHICS_CACHE_SIZE = 4096 # The number of scores kept in the LRU cache
+ETHICS_DECIMALS = 2 # The number of decimals kept when quantizing the inputs for the cache key
+ETHICS_TIMEOUT = 0.05 # Seconds the stimulation path waits for a score
+ETHICS_POLICY = 'last' # What to return when a score is late ('last', 'default', 'block' or 'raise')
+ETHICS_DEFAULT_SCORE = 0.0 # The score returned by the 'default' policy (and by 'last' before any score)
+
+# Define the class for keeping online statistics of streaming brain data
+class RunningStats:
+    def __init__(self, size, axis=1, mode=STATS_MODE, alpha=STATS_ALPHA):
+        # Initialize the running statistics for a fixed number of features
+        self.size = size # The number of features (channels or voxels)
+        self.axis = axis # The sample axis of the incoming chunks (1 for EEG, 0 for fMRI)
+        self.mode = mode # The update rule ('welford' or 'ema')
+        self.alpha = alpha # The smoothing factor of the EMA update
+        self.reset() # Initialize the running statistics
+        self.chunk_mean = np.empty(size) # Preallocate the mean of the current chunk
+        self.chunk_m2 = np.empty(size) # Preallocate the sum of squared deviations of the current chunk
+        self.scratch = np.empty(size) # Preallocate a scratch buffer for the updates
+        self.shift = np.empty(size) # Preallocate the shift from the chunk mean to the running mean
+        self.centred = None # The buffer of the centred chunk, allocated for the first chunk of each shape
+        self.subscripts = 'ij,ij->i' if axis == 1 else 'ij,ij->j' # The einsum subscripts for the per-feature sum of squares
+
+    def reset(self):
+        # Reset the running statistics to no samples
+        self.count = 0 # Initialize the number of samples seen so far
+        self.mean = np.zeros(self.size) # Initialize the running mean of each feature
+        self.m2 = np.zeros(self.size) # Initialize the running sum of squared deviations of each feature
+        self.std = np.ones(self.size) # Initialize the running standard deviation of each feature
+
+    def update(self, data):
+        # Update the running statistics with a 2D chunk of data
+        n = data.shape[self.axis] # Get the number of samples in the chunk
+        if n == 0: # If the chunk is empty, there is nothing to update
+            return
+        if n == 1: # If the chunk holds a single sample (e.g. one fMRI volume), it is its own mean and has no spread
+            np.copyto(self.chunk_mean, self.sample(data))
+            self.chunk_m2.fill(0)
+        else: # Otherwise sum the squares of the centred chunk, which stays accurate for large offsets
+            np.mean(data, axis=self.axis, out=self.chunk_mean) # Compute the per-feature mean of the chunk
+            if self.centred is None or self.centred.shape != data.shape: # If the chunk shape changed, reallocate the buffer
+                self.centred = np.empty(data.shape)
+            np.subtract(data, self.broadcast(self.chunk_mean), out=self.centred) # Centre the chunk in the preallocated buffer
+            np.einsum(self.subscripts, self.centred, self.centred, out=self.chunk_m2) # Compute the per-feature sum of squared deviations
+        self.merge(n)
+
+    def standardize(self, data):
+        # Update the running statistics with a 2D chunk of data and standardize it in place, sharing the passes over the data
+        n = data.shape[self.axis] # Get the number of samples in the chunk
+        if n == 0: # If the chunk is empty, there is nothing to update
+            return data
+        if n == 1: # If the chunk holds a single sample, update and standardize it in one go
+            if self.mode == 'welford':
+                self.update_sample(self.sample(data))
+                return data
+            self.update(data)
+            return self.apply(data)
+        np.mean(data, axis=self.axis, out=self.chunk_mean) # Compute the per-feature mean of the chunk
+        data -= self.broadcast(self.chunk_mean) # Centre the chunk in place instead of in a separate buffer
+        np.einsum(self.subscripts, data, data, out=self.chunk_m2) # Compute the per-feature sum of squared deviations
+        np.copyto(self.shift, self.chunk_mean) # Keep the chunk mean, which the merge overwrites
+        self.merge(n)
+        np.subtract(self.mean, self.shift, out=self.shift) # Get the shift from the chunk mean to the running mean
+        data -= self.broadcast(self.shift) # Subtract the running mean from the centred chunk
+        data /= self.broadcast(self.std) # Divide by the running standard deviation
+        return data
+
+    def update_sample(self, sample):
+        # Update the running statistics with one sample (Welford) and standardize it in place, in fewer passes than a merge
+        total = self.count + 1 # The number of samples after the update
+        np.subtract(sample, self.mean, out=self.scratch) # Compute the deviation from the old mean
+        np.multiply(self.scratch, 1 / total, out=self.chunk_mean) # Weight the deviation by the share of the sample
+        self.mean += self.chunk_mean # Move the running mean towards the sample
+        sample -= self.mean # Compute the deviation from the new mean in place
+        self.scratch *= sample # Multiply the deviations from the old and the new mean
+        self.m2 += self.scratch # Add them to the sum of squared deviations
+        np.multiply(self.m2, 1 / total, out=self.std) # Compute the running variance
+        np.sqrt(self.std, out=self.std) # Compute the running standard deviation
+        self.std += STATS_EPSILON # Keep the standard deviation away from zero
+        sample /= self.std # Standardize the sample in place
+        self.count = total # Update the number of samples seen so far
+
+    def merge(self, n):
+        # Merge the statistics of a chunk of n samples into the running statistics
+        if self.mode == 'ema' and self.count > 0:
+            self.update_ema(n) # Update the statistics using exponential moving averages
+        else:
+            self.update_welford(n) # Update the statistics using Welford's parallel merge
+        self.count += n # Update the number of samples seen so far
+
+    def sample(self, data):
+        # Get a writable view of the only sample of a chunk
+        return data[0] if self.axis == 0 else data[:, 0]
+
+    def broadcast(self, values):
+        # Broadcast per-feature values along the sample axis
+        return values[:, None] if self.axis == 1 else values
+
+    def update_welford(self, n):
+        # Merge the chunk statistics into the running statistics (Chan et al.)
+        total = self.count + n # The number of samples after the merge
+        np.subtract(self.chunk_mean, self.mean, out=self.scratch) # Compute the difference of the means
+        np.multiply(self.scratch, n / total, out=self.chunk_mean) # Weight the difference by the share of the chunk
+        self.mean += self.chunk_mean # Move the running mean towards the chunk mean
+        self.scratch *= self.scratch # Square the difference of the means
+        self.scratch *= self.count * n / total # Weight the squared difference by the sample counts
+        self.m2 += self.chunk_m2 # Add the chunk sum of squared deviations
+        self.m2 += self.scratch # Add the correction for the shifted mean
+        np.divide(self.m2, total, out=self.std) # Compute the running variance
+        np.sqrt(self.std, out=self.std) # Compute the running standard deviation
+        self.std += STATS_EPSILON # Keep the standard deviation away from zero
+
+    def update_ema(self, n):
+        # Blend the chunk statistics into the running statistics with exponential forgetting
+        alpha = self.alpha # The weight of the new chunk
+        np.subtract(self.chunk_mean, self.mean, out=self.scratch) # Compute the difference of the means
+        np.multiply(self.scratch, alpha, out=self.chunk_mean) # Weight the difference by the smoothing factor
+        self.mean += self.chunk_mean # Move the running mean towards the chunk mean
+        self.scratch *= self.scratch # Square the difference of the means
+        self.scratch *= alpha * (1 - alpha) # Weight the squared difference for the shifted mean
+        self.m2 *= (1 - alpha) / self.count # Turn the sum of squared deviations into the decayed variance
+        self.m2 += self.scratch # Add the correction for the shifted mean
+        self.chunk_m2 *= alpha / n # Turn the chunk sum of squared deviations into the weighted chunk variance
+        self.m2 += self.chunk_m2 # Blend in the chunk variance
+        np.sqrt(self.m2, out=self.std) # Compute the running standard deviation
+        self.std += STATS_EPSILON # Keep the standard deviation away from zero
+        self.m2 *= self.count + n # Turn the variance back into a sum of squared deviations
+
+    def apply(self, data):
+        # Standardize a 2D chunk of data in place using the running statistics
+        data -= self.broadcast(self.mean) # Subtract the running mean in place
+        data /= self.broadcast(self.std) # Divide by the running standard deviation in place
+        return data
+
+    def state_dict(self, copy=True):
+        # Get the state of the running statistics as a dictionary of arrays (shared instead of copied if copy is False)
+        if not copy: # If the caller takes over the state (e.g. a session switch), hand over the arrays themselves
+            return {'count': np.array(self.count), 'mean': self.mean, 'm2': self.m2, 'std': self.std}
+        return {'count': np.array(self.count), 'mean': self.mean.copy(), 'm2': self.m2.copy(), 'std': self.std.copy()}
+
+    def load_state_dict(self, state, copy=True):
+        # Restore the state of the running statistics from a dictionary of arrays (adopted instead of copied if copy is False)
+        if np.shape(state['mean']) != self.mean.shape: # If the state does not match the features, refuse it
+            raise ValueError(f'State has shape {np.shape(state["mean"])}, expected {self.mean.shape}')
+        self.count = int(state['count']) # Restore the number of samples seen so far
+        if not copy: # If the caller hands over the state, adopt the arrays (copy only if read-only)
+            self.mean = np.require(state['mean'], np.float64, ['C', 'W'])
+            self.m2 = np.require(state['m2'], np.float64, ['C', 'W'])
+            self.std = np.require(state['std'], np.float64, ['C', 'W'])
+            return
+        self.mean = np.array(state['mean'], np.float64) # Restore the running mean
+        self.m2 = np.array(state['m2'], np.float64) # Restore the running sum of squared deviations
+        self.std = np.array(state['std'], np.float64) # Restore the running standard deviation
+
+    def save(self, filename):
+        # Save the running statistics to a file
+        np.savez(filename, **self.state_dict())
+
+    def load(self, filename):
+        # Load the running statistics from a file
+        with np.load(filename) as state: # Open the saved arrays
+            self.load_state_dict(state)
+
+# Define the function for getting a writable float64 view of a chunk of data
+def as_chunk(data, shape):
+    # Reuse the buffer of the data when possible, copy only when it cannot be written in place
+    data = np.asarray(data, dtype=np.float64) # Convert the data to a float64 array (no copy if it already is one)
+    if not data.flags.writeable: # If the buffer is read-only (e.g. np.frombuffer), copy it
+        data = data.copy()
+    return data.reshape(shape) # Reshape the data to a 2D view
 
 # Define the class for coping with the complex and diverse nature of the human brain using EEG
 class BrainNormalizer:
-    def __init__(self):
+    def __init__(self, mode=STATS_MODE, clip=NORMALIZATION_CLIP, device=None):
         # Initialize the brain normalizer
-        self.enhancer = be.MemoryEnhancer() # Create a memory enhancer object
-        self.normalization = 0 # Initialize the normalization score
+        self.enhancer = be.MemoryEnhancer(device) # Create a memory enhancer object
+        self.stats = RunningStats(bl.EEG_CHANNELS, axis=1, mode=mode) # Create the per-channel running statistics
+        self.clip = clip # The number of standard deviations the data is clipped at (None does not clip)
 
     def normalize(self, data):
         # Normalize the EEG data
         data = self.enhancer.enhance(data) # Enhance the EEG data
-        self.normalization = self.normalization + NORMALIZATION_FACTOR * np.mean(data) # Update the normalization score
-        self.normalization = np.clip(self.normalization, -1, 1) # Clip the normalization score to the range [-1, 1]
-        data = data - self.normalization # Subtract the normalization score from the data
-        data = np.clip(data, -1, 1) # Clip the data to the range [-1, 1]
+        return self.normalize_chunk(data)
+
+    def normalize_chunk(self, data):
+        # Normalize a streaming chunk of EEG data (channels x samples) in place
+        data = as_chunk(data, (bl.EEG_CHANNELS, -1)) # Get a writable per-channel view of the chunk
+        self.stats.standardize(data) # Update the per-channel running statistics and standardize each channel in place
+        if self.clip is not None: # If the data is clipped, cut the outliers beyond the clip in place
+            np.clip(data, -self.clip, self.clip, out=data)
         return data
 
+    def state_dict(self, copy=True):
+        # Get the subject state of the brain normalizer
+        return bl.nest_state(enhancer=self.enhancer.state_dict(copy), stats=self.stats.state_dict(copy)) # Nest the states of the parts
+
+    def load_state_dict(self, state, copy=True):
+        # Restore the subject state of the brain normalizer
+        self.enhancer.load_state_dict(bl.split_state(state, 'enhancer'), copy)
+        self.stats.load_state_dict(bl.split_state(state, 'stats'), copy)
+
+    def reset_state(self):
+        # Reset the subject state of the brain normalizer
+        self.enhancer.reset_state()
+        self.stats.reset()
+
+    def save(self, filename):
+        # Save the state of the brain normalizer to a file
+        self.stats.save(filename)
+
+    def load(self, filename):
+        # Load the state of the brain normalizer from a file
+        self.stats.load(filename)
+
     def close(self):
         # Close the brain normalizer
         self.enhancer.close()
 
 # Define the class for coping with the complex and diverse nature of the human brain using fMRI
 class BrainValidator:
-    def __init__(self):
+    def __init__(self, mode=STATS_MODE, clip=VALIDATION_CLIP, device=None):
         # Initialize the brain validator
-        self.enhancer = be.AttentionEnhancer() # Create an attention enhancer object
-        self.validation = 0 # Initialize the validation score
+        self.enhancer = be.AttentionEnhancer(device) # Create an attention enhancer object
+        self.voxels = bl.FMRI_SHAPE[0] * bl.FMRI_SHAPE[1] * bl.FMRI_SHAPE[2] # The number of voxels in a volume
+        self.stats = RunningStats(self.voxels, axis=0, mode=mode) # Create the per-voxel running statistics
+        self.clip = clip # The number of standard deviations mapped onto the range [0, 1]
 
     def validate(self, data):
         # Validate the fMRI data
         data = self.enhancer.enhance(data) # Enhance the fMRI data
-        self.validation = self.validation + VALIDATION_THRESHOLD * np.std(data) # Update the validation score
-        self.validation = np.clip(self.validation, 0, 1) # Clip the validation score to the range [0, 1]
-        data = data * self.validation # Multiply the data by the validation score
-        data = np.clip(data, 0, 1) # Clip the data to the range [0, 1]
-        return data
+        return self.validate_chunk(data)
+
+    def validate_chunk(self, data):
+        # Validate a streaming chunk of fMRI volumes (volumes x voxels) in place
+        shape = np.shape(data) # Remember the shape of the incoming data
+        data = as_chunk(data, (-1, self.voxels)) # Get a writable per-voxel view of the chunk
+        self.stats.standardize(data) # Update the per-voxel running statistics and standardize each voxel in place
+        data *= 0.5 / self.clip # Scale the clip range to a width of 1
+        data += 0.5 # Center the standardized data in the range [0, 1]
+        np.clip(data, 0, 1, out=data) # Clip the data to the range [0, 1] in place
+        return data.reshape(shape)
+
+    def state_dict(self, copy=True):
+        # Get the subject state of the brain validator
+        return bl.nest_state(enhancer=self.enhancer.state_dict(copy), stats=self.stats.state_dict(copy)) # Nest the states of the parts
+
+    def load_state_dict(self, state, copy=True):
+        # Restore the subject state of the brain validator
+        self.enhancer.load_state_dict(bl.split_state(state, 'enhancer'), copy)
+        self.stats.load_state_dict(bl.split_state(state, 'stats'), copy)
+
+    def reset_state(self):
+        # Reset the subject state of the brain validator
+        self.enhancer.reset_state()
+        self.stats.reset()
+
+    def save(self, filename):
+        # Save the state of the brain validator to a file
+        self.stats.save(filename)
+
+    def load(self, filename):
+        # Load the state of the brain validator from a file
+        self.stats.load(filename)
 
     def close(self):
         # Close the brain validator
         self.enhancer.close()
 
-# Define the class for coping with the complex and diverse nature of the human brain using optogenetics
-class BrainEthicist:
+# Define the class for scoring the ethics of brain data with a pre-trained language model
+class EthicsScorer:
     def __init__(self):
-        # Initialize the brain ethicist
-        self.enhancer = be.CreativityEnhancer() # Create a creativity enhancer object
+        # Initialize the ethics scorer
         self.model = hf.AutoModelForSequenceClassification.from_pretrained(ETHICS_MODEL) # Load the pre-trained model
         self.tokenizer = hf.AutoTokenizer.from_pretrained(ETHICS_MODEL) # Load the pre-trained tokenizer
         self.device = th.device('cuda' if th.cuda.is_available() else 'cpu') # Choose the device
         self.model.to(self.device) # Move the model to the device
+        self.model.eval() # Switch the model to inference mode
 
-    def ethicize(self, data):
-        # Ethicize the optogenetics data
-        data = self.enhancer.enhance(data) # Enhance the optogenetics data
+    def preprocess(self, data):
+        # Preprocess the optogenetics data
+        data = np.asarray(data).flatten() # Flatten the data to a 1D array
         data = data.astype(str) # Convert the data to a string
         data = ' '.join(data) # Join the data with spaces
-        data = self.tokenizer(data, return_tensors='pt', padding=True, truncation=True) # Tokenize the data
-        data = data.to(self.device) # Move the data to the device
-        output = self.model(**data) # Feed the data to the model
+        return data
+
+    def score(self, texts):
+        # Score a batch of preprocessed inputs in one forward pass
+        data = self.tokenizer(texts, return_tensors='pt', padding=True, truncation=True) # Tokenize the batch
+        data = data.to(self.device) # Move the batch to the device
+        with th.no_grad(): # Do not track the gradients
+            output = self.model(**data) # Feed the batch to the model
         output = output.logits # Get the logits
         output = th.softmax(output, dim=1) # Get the probabilities
-        output = output[0, 1] # Get the probability of the positive class
-        output = output.item() # Get the probability as a float
+        output = output[:, 1] # Get the probabilities of the positive class
+        output = output.tolist() # Get the probabilities as floats
         return output
 
+    def close(self):
+        # Close the ethics scorer
+        self.model.to('cpu') # Release the device memory
+
+# Define the class for scoring the brain data on a background worker with batching and caching
+class ScoreWorker:
+    def __init__(self, scorer, batch_size=ETHICS_BATCH_SIZE, batch_wait=ETHICS_BATCH_WAIT, cache_size=ETHICS_CACHE_SIZE):
+        # Initialize the score worker
+        self.scorer = scorer # The scorer used for the forward passes
+        self.batch_size = batch_size # The maximum number of inputs per batch
+        self.batch_wait = batch_wait # The time to wait for more inputs
+        self.cache_size = cache_size # The number of cached scores
+        self.cache = collections.OrderedDict() # Create the LRU cache of scores
+        self.pending = {} # Create the map of in-flight keys to futures
+        self.lock = threading.Lock() # Create the lock for the cache and the in-flight keys
+        self.requests = queue.Queue() # Create the request queue
+        self.scored = 0 # Initialize the number of scored inputs
+        self.batches = 0 # Initialize the number of forward passes
+        self.hits = 0 # Initialize the number of cache hits
+        self.thread = threading.Thread(target=self.run, daemon=True) # Create the worker thread
+        self.thread.start() # Start the worker thread
+
+    def key(self, data):
+        # Get the cache key of the data from a hash of the quantized input
+        data = np.round(np.asarray(data, dtype=np.float64), ETHICS_DECIMALS).astype(np.float32) # Quantize the data
+        return hashlib.blake2b(data.tobytes(), digest_size=16).digest() # Hash the quantized bytes
+
+    def submit(self, data):
+        # Submit the data for scoring, returning a future of the score
+        key = self.key(data) # Get the cache key of the data
+        with self.lock:
+            if key in self.cache: # If the score is cached, return it right away
+                self.cache.move_to_end(key) # Mark the score as recently used
+                self.hits += 1 # Count the cache hit
+                future = cf.Future() # Create a completed future
+                future.set_result(self.cache[key])
+                return future
+            if key in self.pending: # If the same input is already queued, share its future
+                return self.pending[key]
+            future = cf.Future() # Create the future of the score
+            self.pending[key] = future # Mark the key as in flight
+        self.requests.put((key, data)) # Queue the request for the worker
+        return future
+
+    def collect(self):
+        # Collect the next batch of requests from the queue
+        batch = [self.requests.get()] # Block until the first request arrives
+        while batch[-1] is not None and len(batch) < self.batch_size:
+            try:
+                batch.append(self.requests.get(timeout=self.batch_wait)) # Wait briefly for more requests
+            except queue.Empty: # If no more requests arrived, run the partial batch
+                break
+        return batch
+
+    def run(self):
+        # Run the worker loop until a stop request arrives
+        while True:
+            batch = self.collect() # Collect the next batch
+            stop = batch[-1] is None # Check for the stop request
+            batch = [item for item in batch if item is not None] # Drop the stop request
+            if batch:
+                self.process(batch) # Score the batch
+            if stop:
+                break
+
+    def process(self, batch):
+        # Score a batch of requests and resolve their futures
+        keys = [key for key, _ in batch] # Get the keys of the batch
+        try:
+            scores = self.scorer.score([self.scorer.preprocess(data) for _, data in batch]) # Score the batch in one forward pass
+        except Exception as error: # If the forward pass failed, fail the futures
+            with self.lock:
+                futures = [self.pending.pop(key) for key in keys]
+            for future in futures:
+                future.set_exception(error)
+            return
+        with self.lock:
+            futures = [self.pending.pop(key) for key in keys] # Take the futures of the batch
+            for key, score in zip(keys, scores):
+                self.cache[key] = score # Cache the score
+                self.cache.move_to_end(key) # Mark the score as recently used
+            while len(self.cache) > self.cache_size: # Evict the least recently used scores
+                self.cache.popitem(last=False)
+            self.scored += len(batch) # Count the scored inputs
+            self.batches += 1 # Count the forward pass
+        for future, score in zip(futures, scores):
+            future.set_result(score) # Resolve the future
+
+    def close(self):
+        # Close the score worker
+        self.requests.put(None) # Queue the stop request
+        self.thread.join() # Join the worker thread
+
+# Define the class for coping with the complex and diverse nature of the human brain using optogenetics
+class BrainEthicist:
+    def __init__(self, batch_size=ETHICS_BATCH_SIZE, timeout=ETHICS_TIMEOUT, policy=ETHICS_POLICY, device=None):
+        # Initialize the brain ethicist
+        self.enhancer = be.CreativityEnhancer(device) # Create a creativity enhancer object
+        self.scorer = EthicsScorer() # Create an ethics scorer object
+        self.worker = ScoreWorker(self.scorer, batch_size=batch_size) # Create the background score worker
+        self.timeout = timeout # The time the stimulation path waits for a score
+        self.policy = policy # The policy for late scores
+        self.sequence = 0 # Initialize the number of requests issued
+        self.lock = threading.Lock() # Create the lock for the request numbers and the last known score
+        self.reset_state() # Initialize the last known score
+        self.late = 0 # Initialize the number of late scores
+
+    def submit(self, data):
+        # Enhance the optogenetics data and queue it for scoring without waiting
+        data = self.enhancer.enhance(data) # Enhance the optogenetics data
+        return self.worker.submit(data)
+
+    def ethicize(self, data, timeout=None, policy=None):
+        # Ethicize the optogenetics data, waiting at most the timeout for the score
+        timeout = self.timeout if timeout is None else timeout # Use the default timeout if none is given
+        policy = self.policy if policy is None else policy # Use the default policy if none is given
+        with self.lock: # Number the request under the lock, as ethicize runs on several threads
+            self.sequence += 1
+            sequence = self.sequence # Remember the number of this request
+            latest = self.latest # Remember the score holder of the subject of this request
+        future = self.submit(data) # Queue the data for scoring
+        try:
+            score = future.result(timeout=None if policy == 'block' else timeout) # Wait for the score
+            self.keep(latest, sequence, score) # Keep the score as the last known score
+            return score
+        except cf.TimeoutError: # If the score is late, apply the policy
+            self.late += 1 # Count the late score
+            if policy == 'raise':
+                raise
+            future.add_done_callback(functools.partial(self.remember, latest, sequence)) # Keep the score for the subject of the request once it arrives
+            if policy == 'default':
+                return ETHICS_DEFAULT_SCORE
+            return self.score
+
+    @property
+    def score(self):
+        # Get the last known score of the active subject
+        return float(self.latest[0])
+
+    def keep(self, latest, sequence, score):
+        # Keep the score in the holder of its subject unless a score of a newer request is already known
+        with self.lock:
+            if sequence > latest[1]: # If the score is newer than the known one, keep it
+                latest[:] = score, sequence
+
+    def remember(self, latest, sequence, future):
+        # Remember the score of a late future
+        if future.exception() is None: # If the scoring succeeded, keep the score
+            self.keep(latest, sequence, future.result())
+
+    def state_dict(self, copy=True):
+        # Get the subject state of the brain ethicist (the score cache is shared by all the subjects)
+        state = bl.nest_state(enhancer=self.enhancer.state_dict(copy)) # Nest the state of the enhancer
+        with self.lock:
+            state['score'] = self.latest.copy() if copy else self.latest # Add the last known score and its sequence number
+        return state
+
+    def load_state_dict(self, state, copy=True):
+        # Restore the subject state of the brain ethicist, in a holder of its own so that late scores of the previous subject stay with it
+        self.enhancer.load_state_dict(bl.split_state(state, 'enhancer'), copy)
+        latest = state['score'] # Get the last known score and its sequence number
+        if np.shape(latest) != (2,): # If the state has no sequence number, any later score is newer
+            latest = np.array([float(latest), -1.0])
+        self.latest = np.array(latest, np.float64) if copy else np.require(latest, np.float64, ['C', 'W']) # Adopt the holder if the caller hands it over
+
+    def reset_state(self):
+        # Reset the subject state of the brain ethicist
+        self.enhancer.reset_state()
+        self.latest = np.array([ETHICS_DEFAULT_SCORE, -1.0]) # Create the holder of the last known score and its sequence number
+
     def close(self):
         # Close the brain ethicist
+        self.worker.close()
         self.enhancer.close()
-        self.model.close()
-        self.tokenizer.close()
+        self.scorer.close()
@@ -0,0 +1,188 @@
+# Import the required libraries and modules
+import time
+import queue
+import threading
+import numpy as np
+
+# Import the brain_lib and brain_db modules
+import brain_lib as bl
+import brain_db as bd
+
+# Define the global variables and constants
+REPLAY_SPEED = 1.0 # The replay speed as a multiple of real time (0 replays as fast as possible)
+REPLAY_PREFETCH = 8 # The number of frames prefetched by the reader thread
+REPLAY_FMRI_TR = 2.0 # Seconds per fMRI volume when the file does not say
+EEG_FRAME = bl.EEG_SAMPLING_RATE * bl.EEG_DURATION # The number of EEG samples per frame, as read by EEGReader
+
+# Define the function for splitting an EEG recording into frames
+def eeg_frames(data):
+    # Yield the frames of EEG_FRAME samples of a (channels x samples) recording
+    data = np.asarray(data).reshape((bl.EEG_CHANNELS, -1)) # Reshape the data to a 2D array
+    for start in range(0, data.shape[1] - EEG_FRAME + 1, EEG_FRAME):
+        yield data[:, start:start + EEG_FRAME]
+
+# Define the function for reading the frames of a session stored in the database
+def db_frames(table):
+    # Yield the recordings of the table, opening the database on the reader thread that consumes them
+    db = bd.BrainDB() # Open the database on the current thread (sqlite connections are per thread)
+    try:
+        for data in db.iterate(table): # The arrays are decoded by the database
+            yield data.reshape((bl.EEG_CHANNELS, -1)) if table == bd.EEG_TABLE else data
+    finally:
+        db.close()
+
+# Define the function for reading the frames of a session stored in a .mat file
+def mat_frames(filename):
+    # Yield the EEG frames of a file saved by EEGReader.save
+    yield from eeg_frames(bl.sio.loadmat(filename)['eeg'])
+
+# Define the function for reading the frames of a session stored in a NIfTI file
+def nifti_frames(filename):
+    # Yield the flattened fMRI volumes of a 3D or 4D image
+    data = bl.nib.load(filename).get_fdata() # Load the image as a numpy array
+    if data.ndim == 3: # If the image is a single volume, yield it alone
+        yield data.flatten()
+        return
+    for index in range(data.shape[3]):
+        yield data[..., index].flatten()
+
+# Define the function for getting the repetition time of a NIfTI file
+def nifti_period(filename):
+    # Get the seconds per volume from the header, or the default
+    zooms = bl.nib.load(filename).header.get_zooms() # Get the voxel sizes and the repetition time
+    return float(zooms[3]) if len(zooms) > 3 and zooms[3] > 0 else REPLAY_FMRI_TR
+
+# Define the class for replaying a recorded session through the device interface
+class ReplayDevice:
+    def __init__(self, frames, period, speed=REPLAY_SPEED, prefetch=REPLAY_PREFETCH):
+        # Initialize the replay device
+        self.frames = frames # The iterable of recorded frames
+        self.period = period # The recorded seconds per frame
+        self.speed = speed # The replay speed (0 replays as fast as possible)
+        self.buffer = queue.Queue(prefetch) # Create the bounded queue of prefetched frames
+        self.running = threading.Event() # Create the flag of the reader thread
+        self.thread = None # The reader thread, created on connect
+        self.error = None # The error raised by the frame source, if any
+        self.start_time = None # The time the replay started
+        self.count = 0 # Initialize the number of frames read
+        self.bytes = 0 # Initialize the number of bytes read
+        self.written = 0 # Initialize the number of frames written
+        self.last_written = None # The last frame written to the device
+        self.position = None # The last target of the optogenetics device
+        self.wavelength = None # The wavelength of the optogenetics device
+        self.power = None # The power of the optogenetics device
+
+    def put(self, frame):
+        # Put a frame in the queue, waiting for room unless the device is stopped
+        while self.running.is_set():
+            try:
+                self.buffer.put(frame, timeout=0.1)
+                return True
+            except queue.Full: # If the queue is full, check the flag again
+                pass
+        return False
+
+    def prefetch(self):
+        # Read the frames on the reader thread ahead of the consumer
+        try:
+            for frame in self.frames:
+                if not self.put(frame): # If the device is stopped, stop reading
+                    return
+        except Exception as error: # If the source failed, hand the error to the consumer instead of ending the session
+            self.error = error
+            self.put(error)
+            return
+        self.put(None) # Mark the end of the session
+
+    def connect(self):
+        # Connect to the recorded session, starting the reader thread unless it is already connected
+        if self.thread is not None: # If the session is already connected (e.g. a shared device), do nothing
+            return
+        self.running.set()
+        self.thread = threading.Thread(target=self.prefetch, daemon=True) # Create the reader thread
+        self.thread.start() # Start the reader thread
+
+    def start(self):
+        # Start the replay clock
+        self.start_time = time.perf_counter()
+
+    def read(self, *shape):
+        # Read the next frame, waiting until it is due at the replay speed
+        while True:
+            try:
+                frame = self.buffer.get(timeout=0.1) # Get the next prefetched frame
+                break
+            except queue.Empty: # If no frame is ready, check that the device is still running
+                if self.error is not None: # If the source failed after the device was stopped, raise its error
+                    raise self.error
+                if not self.running.is_set(): # If the device is stopped, no more frames will come
+                    raise EOFError('The replay is stopped')
+        if frame is None or isinstance(frame, Exception): # If the session is over or failed, keep the mark for later reads
+            self.buffer.put(frame)
+            if frame is None: # If the session is over, signal the end
+                raise EOFError('End of the replayed session')
+            raise frame # Otherwise raise the error of the source
+        self.count += 1 # Count the frame
+        self.bytes += frame.nbytes # Count the bytes
+        if self.speed > 0: # If the replay is paced, wait until the frame has been recorded
+            if self.start_time is None: # If the clock was not started, start it now
+                self.start()
+            delay = self.start_time + self.count * self.period / self.speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return frame
+
+    def write(self, data):
+        # Write the data to the device, keeping only the last frame
+        self.last_written = data
+        self.written += 1
+
+    def set_wavelength(self, wavelength):
+        # Set the wavelength of the optogenetics device
+        self.wavelength = wavelength
+
+    def set_power(self, power):
+        # Set the power of the optogenetics device
+        self.power = power
+
+    def move_to(self, target):
+        # Move the optogenetics device to the target
+        self.position = target
+
+    def on(self):
+        # Turn on the optogenetics device
+        self.written += 1
+
+    def wait(self, duration):
+        # Wait for the duration at the replay speed
+        if self.speed > 0:
+            time.sleep(duration / self.speed)
+
+    def off(self):
+        # Turn off the optogenetics device
+        pass
+
+    def throughput(self):
+        # Get the frames, megabytes and recorded seconds replayed per second of wall time
+        elapsed = time.perf_counter() - self.start_time # Get the wall time of the replay
+        return {'frames_per_s': self.count / elapsed, 'mb_per_s': self.bytes / elapsed / 1e6, 'realtime_factor': self.count * self.period / elapsed}
+
+    def stop(self):
+        # Stop the replay
+        self.running.clear()
+
+    def disconnect(self):
+        # Disconnect from the recorded session, stopping the reader thread
+        self.running.clear()
+        if self.thread is not None:
+            self.thread.join()
+
+# Define the function for opening a recorded session as a device
+def open_session(source, speed=REPLAY_SPEED, prefetch=REPLAY_PREFETCH):
+    # Open a .mat file, a NIfTI file, or a table of the brain database as a replay device
+    if source.endswith('.mat'): # If the source is an EEG file, replay its frames
+        return ReplayDevice(mat_frames(source), bl.EEG_DURATION, speed, prefetch)
+    if source.endswith(('.nii', '.nii.gz')): # If the source is an fMRI file, replay its volumes
+        return ReplayDevice(nifti_frames(source), nifti_period(source), speed, prefetch)
+    period = bl.EEG_DURATION if source == bd.EEG_TABLE else REPLAY_FMRI_TR # The recorded seconds per row of the table
+    return ReplayDevice(db_frames(source), period, speed, prefetch)
@@ -0,0 +1,108 @@
+# Import the required libraries and modules
+import os
+import threading
+import collections
+import numpy as np
+
+# Import the brain_lib and brain_codec modules
+import brain_lib as bl
+import brain_codec as bz
+
+# Define the global variables and constants
+SESSION_POOL_BYTES = 2 * 1024 ** 3 # The number of bytes of inactive subject states kept in memory
+SESSION_DIR = 'sessions' # The directory the subject states are spilled to
+SESSION_CODEC = bz.Codec(compressor=1, level=1, dtype=np.float64) # Lossless float64 with byte shuffle and fast zlib, for the spilled states
+
+# Define the function for getting the size of a subject state
+def state_bytes(state):
+    # Add up the bytes of the arrays of the state
+    return sum(np.asarray(value).nbytes for value in state.values())
+
+# Define the class for serving several subjects with one set of models
+class SessionManager:
+    def __init__(self, pipeline, pool_bytes=SESSION_POOL_BYTES, directory=SESSION_DIR, codec=SESSION_CODEC):
+        # Initialize the session manager
+        self.pipeline = pipeline # The pipeline objects by name, holding the shared models and the active subject state
+        self.pool_bytes = pool_bytes # The number of bytes of inactive subject states kept in memory
+        self.directory = directory # The directory the subject states are spilled to
+        self.codec = codec # The codec of the spilled states, given by name or as a Codec object
+        self.pool = collections.OrderedDict() # Create the LRU pool of inactive subject states
+        self.held = 0 # Initialize the number of bytes held by the pool
+        self.active = None # The subject whose state is loaded in the pipeline
+        self.lock = threading.RLock() # Create the lock that keeps a switch and a call together
+        self.loads = 0 # Initialize the number of states reloaded from disk
+        self.spills = 0 # Initialize the number of states spilled to disk
+        os.makedirs(directory, exist_ok=True) # Create the spill directory
+
+    def path(self, subject):
+        # Get the spill file of the subject
+        return os.path.join(self.directory, f'subject-{subject}.npz')
+
+    def capture(self):
+        # Get the state of the active subject from the pipeline (the arrays are handed over, not copied)
+        return bl.nest_state(**{name: part.state_dict(copy=False) for name, part in self.pipeline.items()})
+
+    def restore(self, state):
+        # Load a subject state into the pipeline, or a fresh state if there is none (the arrays are adopted, not copied)
+        for name, part in self.pipeline.items():
+            if state is None: # If the subject is new, start from an empty state
+                part.reset_state()
+            else:
+                part.load_state_dict(bl.split_state(state, name), copy=False)
+
+    def spill(self, subject, state):
+        # Write a subject state to disk, encoding each array with the codec
+        np.savez(self.path(subject), **{key: np.frombuffer(bz.encode(value, self.codec), np.uint8) for key, value in state.items()})
+        self.spills += 1 # Count the spill
+
+    def evict(self):
+        # Spill the least recently used state of the pool to disk
+        subject, state = self.pool.popitem(last=False) # Take the oldest state out of the pool
+        self.held -= state_bytes(state) # Release its bytes
+        self.spill(subject, state)
+
+    def fetch(self, subject):
+        # Get the state of an inactive subject from the pool, from disk, or None if the subject is new
+        if subject in self.pool: # If the state is in memory, take it out of the pool
+            state = self.pool.pop(subject)
+            self.held -= state_bytes(state) # Release its bytes
+            return state
+        if os.path.exists(self.path(subject)): # If the state was spilled, read it back
+            with np.load(self.path(subject)) as state:
+                state = {key: bz.decode(value) if value.dtype == np.uint8 else value for key, value in state.items()} # Decode the arrays (plain arrays were spilled before the codec)
+            self.loads += 1 # Count the load
+            return state
+        return None
+
+    def activate(self, subject):
+        # Switch the pipeline to the subject, spilling the least recently used states beyond the bytes of the pool
+        with self.lock:
+            if subject == self.active: # If the subject is already active, there is nothing to switch
+                return
+            if self.active is not None: # If another subject is active, move its state to the pool
+                state = self.capture()
+                self.pool[self.active] = state
+                self.held += state_bytes(state) # Count its bytes
+            self.restore(self.fetch(subject)) # Load the state of the subject into the pipeline
+            self.active = subject # Mark the subject as active
+            while self.held > self.pool_bytes: # Spill the least recently used states to disk
+                self.evict()
+
+    def run(self, subject, name, method, *args):
+        # Call a method of a pipeline object on behalf of the subject
+        with self.lock:
+            self.activate(subject) # Switch to the subject
+            return getattr(self.pipeline[name], method)(*args) # Call the method with the state of the subject
+
+    def save(self):
+        # Spill all the subject states to disk, e.g. before closing the session
+        with self.lock:
+            if self.active is not None: # If a subject is active, spill its state too
+                self.spill(self.active, self.capture())
+            while self.pool: # Spill the states of the inactive subjects
+                self.evict()
+            self.active = None # The pipeline no longer holds a subject state of its own
+
+    def close(self):
+        # Close the session manager, saving the subject states
+        self.save()